@@ -1,15 +1,43 @@
 #pydub installed which is a package 
-from fastapi import FastAPI, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import base64
+import contextvars
+import hashlib
+import json
+import math
 import os
-from groq import Groq
+import re
+import threading
+import time
+import unicodedata
+import uuid
+import wave
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from groq import AsyncGroq, RateLimitError
 from dotenv import load_dotenv
-from gtts import gTTS
 from io import BytesIO
 from pydub import AudioSegment
-from pydub.effects import speedup
+
+from audio_dsp import (
+    StreamingVAD,
+    array_to_segment,
+    pcm_to_wav,
+    preprocess_speech,
+    segment_to_array,
+    segment_to_l16,
+    time_stretch,
+)
+from stt_backends import get_stt_backend, load_audio
+from tts_backends import get_tts_backend
+from metrics import CONTENT_TYPE, REGISTRY, SIZE_BUCKETS, Counter, Gauge, Histogram
+from tracing import TRACEPARENT_HEADER, Tracer, get_span_sink
 
 load_dotenv()
 
@@ -22,6 +50,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["*"],
 )
 
 # Load API key
@@ -30,47 +59,1365 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     raise Exception("Please set GROQ_API_KEY in .env file!")
 
-groq_client = Groq(api_key=GROQ_API_KEY)
+groq_client = AsyncGroq(api_key=GROQ_API_KEY)
+
+# TTS engine: "gtts" (default, Google voices) or "espeak" (local espeak-ng, offline)
+TTS_BACKEND = os.getenv("TTS_BACKEND", "gtts")
+tts_backend = get_tts_backend(TTS_BACKEND)
+
+# STT engine: "google" (default), or offline "vosk" (needs VOSK_MODEL_PATH) / "sphinx"
+STT_BACKEND = os.getenv("STT_BACKEND", "google")
+stt_backend = get_stt_backend(STT_BACKEND)
+
+# LLM settings shared by every endpoint
+LLM_MODEL = "llama-3.1-8b-instant"
+LLM_MAX_TOKENS = 200
+LLM_TEMPERATURE = 0.7
+
+SUPPORTED_LANGUAGES = {
+    "en": "English",
+    "bn": "Bengali", 
+    "hi": "Hindi",
+    "es": "Spanish",
+    "fr": "French",
+    "de": "German",
+    "it": "Italian",
+    "ja": "Japanese",
+    "ko": "Korean",
+    "zh": "Chinese"
+}
+
+# Metadata headers sent with binary audio responses (text values are percent-encoded)
+AUDIO_METADATA_HEADERS = {
+    "your_question": "X-Question",
+    "ai_answer": "X-AI-Answer",
+    "audio_size_kb": "X-Audio-Size-KB",
+    "tts_engine": "X-TTS-Engine",
+    "speed": "X-Speed",
+    "language": "X-Language",
+    "language_name": "X-Language-Name",
+    "answer_cached": "X-Answer-Cached",
+    "response_id": "X-Response-Id",
+    "transcript": "X-Transcript",
+    "stt_trimmed_seconds": "X-STT-Trimmed-Seconds",
+    "stt_saved_kb": "X-STT-Saved-KB",
+    "session_id": "X-Session-Id",
+    "audio_format": "X-Audio-Format"
+}
+
+# Output audio formats selectable per request (audio_format field or Accept header).
+# "mp3" is the TTS MP3 as-is at 1.0x and re-encoded at the source's bitrate otherwise;
+# the others are mono speech encodings made in the same decode → time stretch →
+# encode pass as the speed adjustment.
+PCM_SAMPLE_RATE = 24000
+# gTTS already sends 32 kbps mono, so "low" has to go below that to save anything
+MP3_LOW_KBPS = int(os.getenv("MP3_LOW_KBPS", "24"))
+MP3_BITRATES_KBPS = (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+AUDIO_FORMATS = {
+    "mp3": {"media_type": "audio/mpeg", "extension": "mp3", "export": {"format": "mp3"}},
+    "mp3_low": {
+        "media_type": "audio/mpeg",
+        "extension": "mp3",
+        "export": {"format": "mp3", "bitrate": f"{MP3_LOW_KBPS}k"}
+    },
+    "ogg_opus": {
+        "media_type": "audio/ogg; codecs=opus",
+        "extension": "ogg",
+        "export": {"format": "ogg", "codec": "libopus", "bitrate": os.getenv("OPUS_BITRATE", "24k"),
+                   "parameters": ["-application", "voip"]}
+    },
+    "webm_opus": {
+        "media_type": "audio/webm; codecs=opus",
+        "extension": "webm",
+        "export": {"format": "webm", "codec": "libopus", "bitrate": os.getenv("OPUS_BITRATE", "24k"),
+                   "parameters": ["-application", "voip"]}
+    },
+    # Raw samples, no container: the rate and channel count are in the media type
+    "pcm": {"media_type": f"audio/L16; rate={PCM_SAMPLE_RATE}; channels=1", "extension": "pcm", "export": None}
+}
+# Accept header media types (without parameters) → AUDIO_FORMATS name
+ACCEPT_AUDIO_FORMATS = {
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+    "audio/ogg": "ogg_opus",
+    "audio/opus": "ogg_opus",
+    "audio/webm": "webm_opus",
+    "audio/l16": "pcm"
+}
+
+# Sentence boundary: terminal punctuation (latin, devanagari/bengali danda, CJK)
+# followed by whitespace
+SENTENCE_END = re.compile(r"(?<=[.!?।。！？])\s+")
+
+
+# -----------------------------
+# Prometheus metrics (served at /metrics)
+# -----------------------------
+STAGE_LABELS = ("stage", "backend", "language", "speed_bucket")
+stage_seconds = Histogram("voice_stage_seconds", "Time spent per pipeline stage", STAGE_LABELS)
+stage_in_flight = Gauge("voice_stage_in_flight", "Calls currently running per stage", ("stage",))
+stage_errors = Counter("voice_stage_errors_total", "Failed calls per stage", ("stage", "backend", "error"))
+payload_bytes = Histogram(
+    "voice_payload_bytes", "Size of audio and response payloads",
+    ("kind", "backend", "language", "speed_bucket", "format"), buckets=SIZE_BUCKETS
+)
+http_seconds = Histogram(
+    "voice_http_request_seconds", "HTTP latency until response headers", ("route", "method", "status")
+)
+http_in_flight = Gauge("voice_http_requests_in_flight", "HTTP requests being handled")
+# Refreshed from the caches, gates and flights on every scrape
+cache_hits = Counter("voice_cache_hits_total", "Cache hits since start", ("cache",))
+cache_misses = Counter("voice_cache_misses_total", "Cache misses since start", ("cache",))
+cache_hit_ratio = Gauge("voice_cache_hit_ratio", "Cache hits / lookups since start", ("cache",))
+cache_entries = Gauge("voice_cache_entries", "Entries held per cache", ("cache",))
+admission_active = Gauge("voice_admission_active", "Calls holding an admission slot", ("stage",))
+admission_waiting = Gauge("voice_admission_waiting", "Calls queued for an admission slot", ("stage",))
+admission_rejected = Counter(
+    "voice_admission_rejected_total", "Calls turned away since start (queue full or wait timeout)", ("stage",)
+)
+coalesced_calls = Counter("voice_coalesced_calls_total", "Calls that shared an in-flight computation", ("flight",))
+active_sessions = Gauge("voice_sessions", "Live conversation sessions")
+
+
+# Per-request spans; TRACE_SINK=jsonl writes them to TRACE_FILE
+tracer = Tracer("api", get_span_sink(os.getenv("TRACE_SINK", "none")))
+# Health checks and scrapes hit these every few seconds; they get metrics but no spans
+UNTRACED_PATHS = {"/health", "/metrics"}
+
+
+def speed_bucket(speed) -> str:
+    """Quarter-step bucket for a speed label ("0.75" covers 0.75 up to 1.0), "" if not applicable"""
+    if speed is None:
+        return ""
+    return f"{math.floor(float(speed) * 4) / 4:.2f}"
+
+
+@contextmanager
+def observe_stage(stage: str, backend: str = "", language: str = "", speed: float = None):
+    """Time a pipeline stage (metrics and a trace span), count it as in flight and count its errors"""
+    start = time.perf_counter()
+    with stage_in_flight.track_inprogress(stage=stage), \
+            tracer.span(stage, backend=backend, language=language, speed=speed):
+        try:
+            yield
+        except Exception as e:
+            stage_errors.inc(stage=stage, backend=backend, error=type(e).__name__)
+            raise
+        finally:
+            stage_seconds.observe(
+                time.perf_counter() - start,
+                stage=stage, backend=backend, language=language, speed_bucket=speed_bucket(speed)
+            )
+
+
+class UpstreamHealth:
+    """
+    Passive upstream health: the outcome of the latest real call to each upstream
+    
+    /health reports this instead of probing Groq or Google on every request.
+    """
+    
+    def __init__(self):
+        self._status = {}
+    
+    @contextmanager
+    def track(self, name: str):
+        """Record whether the wrapped upstream call succeeded"""
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self._status[name] = {"reachable": False, "checked_at": time.time(), "error": str(e)[:200]}
+            raise
+        self._status[name] = {
+            "reachable": True,
+            "checked_at": time.time(),
+            "latency_ms": round((time.monotonic() - start) * 1000, 1)
+        }
+    
+    def snapshot(self) -> dict:
+        return dict(self._status)
+
+
+upstream_health = UpstreamHealth()
+
+# gTTS and pydub/ffmpeg are blocking, so they run on bounded worker pools
+# instead of the event loop. Gated stages get their own pool (see run_stage);
+# this one takes the rest, such as disk cache reads and writes.
+AUDIO_WORKERS = int(os.getenv("AUDIO_WORKERS", "4"))
+audio_executor = ThreadPoolExecutor(max_workers=AUDIO_WORKERS, thread_name_prefix="audio")
+
+
+async def run_in_executor(executor: ThreadPoolExecutor, func, *args, **kwargs):
+    """Run a blocking function on a worker pool without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    # Carry the caller's context (the open trace span) over to the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, partial(context.run, func, *args, **kwargs))
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking function on the audio worker pool"""
+    return await run_in_executor(audio_executor, func, *args, **kwargs)
+
+
+class Overloaded(Exception):
+    """
+    A stage is saturated (503) or an upstream rate-limited us (429)
+    
+    Answered with a Retry-After header instead of letting the request queue up.
+    """
+    
+    def __init__(self, stage: str, retry_after: int, status_code: int = 503):
+        reason = "upstream rate limit reached" if status_code == 429 else "is overloaded"
+        super().__init__(f"{stage} {reason}, retry in {retry_after}s")
+        self.stage = stage
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class AdmissionGate:
+    """
+    Concurrency limit with a bounded wait queue for one upstream stage
+    
+    At most `limit` calls run at once and at most `max_queue` wait for a slot.
+    A caller that finds the queue full, or waits longer than `queue_timeout`
+    seconds, gets Overloaded right away instead of adding to the pile-up.
+    """
+    
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # Moving average of how long a call holds its slot, for Retry-After
+        self.avg_seconds = 1.0
+    
+    def retry_after(self) -> int:
+        """Seconds until the current queue has likely drained"""
+        return min(60, max(1, math.ceil(self.avg_seconds * (self.waiting + 1) / self.limit)))
+    
+    @asynccontextmanager
+    async def slot(self):
+        if not self._semaphore.locked():
+            # A free slot is taken without suspending
+            await self._semaphore.acquire()
+        elif self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.name, self.retry_after())
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise Overloaded(self.name, self.retry_after())
+            finally:
+                self.waiting -= 1
+        
+        self.active += 1
+        self.admitted += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * (time.monotonic() - start)
+            self._semaphore.release()
+    
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_seconds": round(self.avg_seconds, 3)
+        }
+
+
+# Per-stage limits: ADMISSION_<STAGE>_CONCURRENCY and ADMISSION_<STAGE>_QUEUE
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+ADMISSION_DEFAULTS = {
+    "llm": (8, 32),
+    "tts": (4, 32),
+    "transcode": (AUDIO_WORKERS, 32),
+    "stt": (4, 16)
+}
+admission = {
+    stage: AdmissionGate(
+        stage,
+        limit=int(os.getenv(f"ADMISSION_{stage.upper()}_CONCURRENCY", str(limit))),
+        max_queue=int(os.getenv(f"ADMISSION_{stage.upper()}_QUEUE", str(max_queue))),
+        queue_timeout=ADMISSION_QUEUE_TIMEOUT
+    )
+    for stage, (limit, max_queue) in ADMISSION_DEFAULTS.items()
+}
+# One pool per blocking stage, as large as its gate, so an admitted call starts
+# right away: queueing happens only at the gate, where the queue is bounded and
+# timed, and a saturated stage cannot hold up another stage or a cache read
+stage_executors = {
+    stage: ThreadPoolExecutor(max_workers=admission[stage].limit, thread_name_prefix=stage)
+    for stage in ("tts", "transcode", "stt")
+}
+
+
+async def run_stage(stage: str, func, *args, **kwargs):
+    """Run a blocking function on the stage's own pool once its admission gate lets the call through"""
+    async with admission[stage].slot():
+        return await run_in_executor(stage_executors[stage], func, *args, **kwargs)
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc), "stage": exc.stage, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+class AudioCache:
+    """
+    Content-addressed audio cache with an in-memory LRU tier and an optional disk tier
+    
+    The memory tier is bounded by total bytes, evicting least recently used entries.
+    The disk tier (one file per key) survives restarts and refills the memory tier on a hit.
+    """
+    
+    def __init__(self, max_bytes: int, disk_dir: str = None, suffix: str = ".mp3"):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.suffix = suffix
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+    
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + self.suffix)
+    
+    def _store(self, key: str, data: bytes):
+        # Caller holds the lock
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key))
+        if len(data) > self.max_bytes:
+            return
+        self._entries[key] = data
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+    
+    def get_memory(self, key: str, count: bool = True):
+        """
+        Return cached bytes from the memory tier, or None (cheap enough for the event loop)
+        
+        A memory hit is counted here; a miss is left for get_disk to count once the
+        disk tier has been tried too. count=False peeks without touching the counters.
+        """
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                if count:
+                    self.hits += 1
+                    self.memory_hits += 1
+            return data
+    
+    def get_disk(self, key: str, count: bool = True):
+        """Return cached bytes from the disk tier, or None, counting the hit or miss (blocking)"""
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    data = f.read()
+            except OSError:
+                data = None
+            if data:
+                with self._lock:
+                    self._store(key, data)
+                    if count:
+                        self.hits += 1
+                        self.disk_hits += 1
+                return data
+        
+        if count:
+            with self._lock:
+                self.misses += 1
+        return None
+    
+    def get(self, key: str):
+        """Return cached bytes for key, or None (blocking when the disk tier is enabled)"""
+        data = self.get_memory(key)
+        if data is not None:
+            return data
+        return self.get_disk(key)
+    
+    def put_memory(self, key: str, data: bytes):
+        """Store bytes under key in the memory tier"""
+        with self._lock:
+            self._store(key, data)
+    
+    def put_disk(self, key: str, data: bytes):
+        """Store bytes under key in the disk tier, if enabled (blocking)"""
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so a crash never leaves a truncated entry
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not write audio cache file: {str(e)}")
+    
+    def put(self, key: str, data: bytes):
+        """Store bytes under key in memory and, if enabled, on disk"""
+        self.put_memory(key, data)
+        self.put_disk(key, data)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_kb": round(self._bytes / 1024, 2),
+                "max_size_kb": round(self.max_bytes / 1024, 2),
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "disk_enabled": bool(self.disk_dir)
+            }
+
+
+# TTS audio cache: TTS_CACHE_MAX_MB bounds the memory tier, TTS_CACHE_DIR enables the disk tier
+tts_cache = AudioCache(
+    max_bytes=int(float(os.getenv("TTS_CACHE_MAX_MB", "64")) * 1024 * 1024),
+    disk_dir=os.getenv("TTS_CACHE_DIR") or None
+)
+
+
+async def cache_get(cache: AudioCache, key: str):
+    """Look up key, serving memory hits on the event loop and only sending disk reads to the worker pool"""
+    data = cache.get_memory(key)
+    if data is not None:
+        return data
+    if cache.disk_dir:
+        return await run_blocking(cache.get_disk, key)
+    # Nothing to read, this only counts the miss
+    return cache.get_disk(key)
+
+
+async def cache_put(cache: AudioCache, key: str, data: bytes):
+    """Store key in the memory tier right away and write the disk tier on the worker pool"""
+    cache.put_memory(key, data)
+    if cache.disk_dir:
+        await run_blocking(cache.put_disk, key, data)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache keys (unicode form and whitespace)"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
 
 
-def adjust_audio_speed(audio_bytes: bytes, speed: float) -> bytes:
+def tts_cache_key(answer_text: str, language: str, speed: float, audio_format: str = "mp3") -> str:
+    """Content hash of everything that determines the synthesized audio"""
+    raw = f"{tts_backend.name}\x00{normalize_text(answer_text)}\x00{language}\x00{round(speed, 2)}"
+    # MP3 keys (and so response ids) are the same as before output formats existed
+    if audio_format != "mp3":
+        raw += f"\x00{audio_format}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MasterAudio:
+    """The 1.0x audio of one response, the source for every speed variant"""
+    
+    __slots__ = ("answer_text", "language", "mp3", "pcm")
+    
+    def __init__(self, answer_text: str, language: str, mp3: bytes):
+        self.answer_text = answer_text
+        self.language = language
+        self.mp3 = mp3
+        # Decoded on first use, see decoded()
+        self.pcm = None
+    
+    def decoded(self) -> AudioSegment:
+        if self.pcm is None:
+            self.pcm = AudioSegment.from_file(BytesIO(self.mp3), format="mp3")
+        return self.pcm
+    
+    def size(self) -> int:
+        return len(self.mp3) + (len(self.pcm.raw_data) if self.pcm is not None else 0)
+
+
+class MasterStore:
     """
-    Adjust the playback speed of audio
+    LRU of MasterAudio by response id, bounded by MP3 + decoded PCM bytes
+    """
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+    
+    def get(self, response_id: str):
+        with self._lock:
+            master = self._entries.get(response_id)
+            if master is not None:
+                self._entries.move_to_end(response_id)
+            return master
+    
+    def put(self, response_id: str, master: MasterAudio):
+        with self._lock:
+            self._entries[response_id] = master
+            self._entries.move_to_end(response_id)
+            self._evict()
+    
+    def touch(self):
+        """Re-check the size bound after a master was decoded"""
+        with self._lock:
+            self._evict()
+    
+    def _evict(self):
+        # Caller holds the lock; always keep the most recent entry
+        total = sum(master.size() for master in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            total -= evicted.size()
+            self.evictions += 1
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_kb": round(sum(m.size() for m in self._entries.values()) / 1024, 2),
+                "max_size_kb": round(self.max_bytes / 1024, 2),
+                "evictions": self.evictions
+            }
+
+
+# Decoded 1.0x masters addressable by the response_id returned from /ask
+master_store = MasterStore(max_bytes=int(float(os.getenv("MASTER_STORE_MAX_MB", "128")) * 1024 * 1024))
+
+
+class AnswerCache:
+    """
+    In-memory LLM answer cache with a TTL and an entry limit
+    
+    Any object with the same get/put/stats methods (e.g. a Redis-backed one)
+    can be assigned to `answer_cache` instead.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: str):
+        """Return the cached answer for key, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, answer = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return answer
+            del self._entries[key]
+            self.expirations += 1
+        self.misses += 1
+        return None
+    
+    def put(self, key: str, answer: str):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+answer_cache = AnswerCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+)
+
+
+def answer_cache_key(question: str, model: str, max_tokens: int, temperature: float) -> str:
+    """Hash of the normalized question and the generation parameters"""
+    raw = f"{normalize_text(question).casefold()}\x00{model}\x00{max_tokens}\x00{temperature}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into one shared computation
+    
+    The first caller for a key starts the work; callers arriving while it is
+    in flight await the same result (or exception) instead of repeating it.
+    The shared work is shielded, so one caller disconnecting does not cancel
+    it for the others.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight = {}
+        self.calls = 0
+        self.coalesced = 0
+    
+    async def run(self, key: str, make_coroutine):
+        """Await make_coroutine() once per key among concurrent callers"""
+        self.calls += 1
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(make_coroutine())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+    
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "coalesced": self.coalesced
+        }
+
+
+# Identical concurrent LLM questions, and identical whole /ask requests, share one computation
+llm_flight = SingleFlight("llm")
+ask_flight = SingleFlight("ask")
+
+# Prompt budget per session turn (estimated tokens); older turns are summarized beyond it
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "1500"))
+# Most recent turns that are always kept verbatim
+SESSION_KEEP_TURNS = int(os.getenv("SESSION_KEEP_TURNS", "4"))
+SESSION_SUMMARY_MAX_TOKENS = 250
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token), good enough for budgeting"""
+    return len(text) // 4 + 1
+
+
+class ConversationSession:
+    """
+    Server-side conversation: a system prompt, a rolling summary of older turns
+    and the recent turns verbatim
+    """
+    
+    def __init__(self, session_id: str, system: str = ""):
+        self.session_id = session_id
+        self.system = system
+        self.summary = ""
+        # List of (user, assistant) pairs not yet folded into the summary
+        self.turns = []
+        self.total_turns = 0
+        self.compactions = 0
+        # Set while a summary is being written, so only one runs at a time
+        self.compacting = False
+        # One turn at a time per session, so answers see each other
+        self.lock = asyncio.Lock()
+    
+    def system_message(self) -> str:
+        if not self.summary:
+            return self.system
+        return f"{self.system}\n\nSummary of the conversation so far:\n{self.summary}".strip()
+    
+    def token_count(self) -> int:
+        return estimate_tokens(self.system_message()) + sum(
+            estimate_tokens(user) + estimate_tokens(assistant) for user, assistant in self.turns
+        )
+    
+    def messages(self, question: str) -> list:
+        """
+        Chat messages for the next turn: system, recent turns, then the question
+        
+        Turns that do not fit in SESSION_TOKEN_BUDGET are left out (oldest
+        first) until compaction has summarized them, so the prompt stays
+        bounded even if summarization fails.
+        """
+        system = self.system_message()
+        budget = SESSION_TOKEN_BUDGET - estimate_tokens(system) - estimate_tokens(question)
+        recent = []
+        for user, assistant in reversed(self.turns):
+            budget -= estimate_tokens(user) + estimate_tokens(assistant)
+            if budget < 0:
+                break
+            recent.append({"role": "assistant", "content": assistant})
+            recent.append({"role": "user", "content": user})
+        
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.extend(reversed(recent))
+        messages.append({"role": "user", "content": question})
+        return messages
+    
+    def add_turn(self, question: str, answer: str):
+        self.turns.append((question, answer))
+        self.total_turns += 1
+    
+    def info(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "system": self.system,
+            "summary": self.summary,
+            "turns": [{"user": user, "assistant": assistant} for user, assistant in self.turns],
+            "total_turns": self.total_turns,
+            "compactions": self.compactions,
+            "estimated_tokens": self.token_count(),
+            "token_budget": SESSION_TOKEN_BUDGET
+        }
+
+
+class SessionStore:
+    """In-memory sessions, dropped after `ttl_seconds` idle or when over `max_sessions` (LRU)"""
+    
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self.expirations = 0
+        self.evictions = 0
+    
+    def create(self, system: str = "") -> ConversationSession:
+        session = ConversationSession(uuid.uuid4().hex, system)
+        self._sessions[session.session_id] = (time.monotonic() + self.ttl_seconds, session)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+        return session
+    
+    def get(self, session_id: str):
+        """Return the session and refresh its idle timer, or None if unknown or expired"""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        expires_at, session = entry
+        if expires_at <= time.monotonic():
+            del self._sessions[session_id]
+            self.expirations += 1
+            return None
+        self._sessions[session_id] = (time.monotonic() + self.ttl_seconds, session)
+        self._sessions.move_to_end(session_id)
+        return session
+    
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+    
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "expirations": self.expirations,
+            "evictions": self.evictions
+        }
+
+
+session_store = SessionStore(
+    max_sessions=int(os.getenv("SESSION_MAX", "1000")),
+    ttl_seconds=float(os.getenv("SESSION_TTL", "3600"))
+)
+
+
+async def llm_completion(messages: list, max_tokens: int = LLM_MAX_TOKENS,
+                         temperature: float = LLM_TEMPERATURE, stream: bool = False):
+    """
+    Groq chat completion, with Groq's own rate limiting surfaced as a 429
+    
+    Non-streaming calls wait for an LLM admission slot here. Streaming callers
+    hold the slot themselves until the stream has been read.
+    """
+    async def create():
+        with observe_stage("llm_stream_start" if stream else "llm", LLM_MODEL), upstream_health.track("llm"):
+            try:
+                return await groq_client.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=stream
+                )
+            except RateLimitError as e:
+                retry_after = e.response.headers.get("retry-after", "")
+                raise Overloaded("llm", int(float(retry_after)) + 1 if retry_after else 5, status_code=429)
+    
+    if stream:
+        return await create()
+    async with admission["llm"].slot():
+        return await create()
+
+
+async def compact_session(session: ConversationSession):
+    """
+    Fold the session's older turns into its rolling summary once it is over the token budget
+    
+    The newest SESSION_KEEP_TURNS turns stay verbatim. If the summary call
+    fails the turns are kept; messages() still leaves out what does not fit.
+    
+    The lock is only held to snapshot the turns and to swap the summary in, so
+    the session keeps answering while the summary is written.
+    """
+    async with session.lock:
+        if session.compacting:
+            return
+        if session.token_count() <= SESSION_TOKEN_BUDGET or len(session.turns) <= SESSION_KEEP_TURNS:
+            return
+        old_turns = session.turns[:len(session.turns) - SESSION_KEEP_TURNS]
+        old_summary = session.summary
+        session.compacting = True
+    
+    try:
+        transcript = "\n".join(f"User: {user}\nAssistant: {assistant}" for user, assistant in old_turns)
+        try:
+            llm_response = await llm_completion(
+                [
+                    {"role": "system", "content": "You keep the memory of an ongoing conversation. "
+                        "Write a concise summary that keeps names, facts, decisions, the questions "
+                        "asked and how the user answered them."},
+                    {"role": "user", "content": f"Current summary:\n{old_summary or '(none)'}"
+                        f"\n\nNew turns:\n{transcript}\n\nWrite the updated summary."}
+                ],
+                max_tokens=SESSION_SUMMARY_MAX_TOKENS,
+                temperature=0.2
+            )
+        except Exception as e:
+            print(f"⚠️ Session summary failed, keeping turns: {str(e)}")
+            return
+        
+        async with session.lock:
+            # Turns are only appended, so the snapshot is still the oldest part of the history
+            if session.summary != old_summary or session.turns[:len(old_turns)] != old_turns:
+                return
+            session.summary = llm_response.choices[0].message.content.strip()
+            del session.turns[:len(old_turns)]
+            session.compactions += 1
+            print(f"🗜️ Session {session.session_id[:8]}: summarized {len(old_turns)} turns, "
+                  f"~{session.token_count()} tokens left")
+    finally:
+        session.compacting = False
+
+
+# asyncio only keeps weak references to tasks, so running summaries are held here
+compaction_tasks = set()
+
+
+def schedule_compaction(session: ConversationSession):
+    """Summarize in the background so the answer that crossed the budget is not delayed"""
+    if session.token_count() > SESSION_TOKEN_BUDGET:
+        task = asyncio.ensure_future(compact_session(session))
+        compaction_tasks.add(task)
+        task.add_done_callback(compaction_tasks.discard)
+
+
+async def session_answer(session: ConversationSession, question: str) -> str:
+    """Answer the next turn of a session with its history and record the turn"""
+    async with session.lock:
+        llm_response = await llm_completion(session.messages(question))
+        answer_text = llm_response.choices[0].message.content
+        session.add_turn(question, answer_text)
+    schedule_compaction(session)
+    return answer_text
+
+
+async def generate_answer(question: str, use_cache: bool = True, session: ConversationSession = None):
+    """
+    Get the LLM answer for a question, serving repeats from the answer cache
     
     Args:
-        audio_bytes: Original audio data
+        question: The text question to ask the AI
+        use_cache: Set False to always call Groq (callers who want varied answers)
+        session: Answer as the next turn of this conversation (never cached)
+    
+    Returns:
+        Tuple of (answer text, whether it came from the cache)
+    """
+    if session is not None:
+        return await session_answer(session, question), False
+    
+    cache_key = answer_cache_key(question, LLM_MODEL, LLM_MAX_TOKENS, LLM_TEMPERATURE)
+    if use_cache:
+        answer_text = answer_cache.get(cache_key)
+        if answer_text is not None:
+            return answer_text, True
+    
+    async def call_llm():
+        llm_response = await llm_completion([{"role": "user", "content": question}])
+        answer_text = llm_response.choices[0].message.content
+        
+        # Fresh answers still refresh the cache for callers that do want reuse
+        answer_cache.put(cache_key, answer_text)
+        return answer_text
+    
+    # Callers asking for variety get their own completion
+    if not use_cache:
+        return await call_llm(), False
+    return await llm_flight.run(cache_key, call_llm), False
+
+
+def mp3_bitrate_kbps(mp3_size: int, seconds: float) -> int:
+    """Nominal bitrate of an MP3 from its size and duration (nearest standard rate)"""
+    if seconds <= 0:
+        return MP3_BITRATES_KBPS[0]
+    kbps = mp3_size * 8 / seconds / 1000
+    return min(MP3_BITRATES_KBPS, key=lambda rate: abs(rate - kbps))
+
+
+def passes_through(audio_format: str, source_kbps: int) -> bool:
+    """Whether the 1.0x source MP3 can be sent unchanged in `audio_format`"""
+    return audio_format == "mp3" or (audio_format == "mp3_low" and source_kbps <= MP3_LOW_KBPS)
+
+
+def encode_audio(audio: AudioSegment, audio_format: str, source_kbps: int = None) -> bytes:
+    """
+    Encode decoded audio in one of AUDIO_FORMATS
+    
+    Args:
+        audio: Decoded audio
+        audio_format: AUDIO_FORMATS name
+        source_kbps: Bitrate of the MP3 the audio was decoded from; MP3 output
+            never exceeds it (libmp3lame would default to 128 kbps)
+    
+    Returns:
+        Encoded audio bytes
+    """
+    if audio_format == "pcm":
+        return segment_to_l16(audio, PCM_SAMPLE_RATE)
+    
+    export = dict(AUDIO_FORMATS[audio_format]["export"])
+    if audio_format == "mp3":
+        # Same bitrate and (through the decoded segment) channel count as the source
+        if source_kbps:
+            export["bitrate"] = f"{source_kbps}k"
+    else:
+        # Speech formats are mono; ffmpeg resamples to a rate the codec supports
+        audio = audio.set_channels(1)
+        if audio_format == "mp3_low" and source_kbps:
+            export["bitrate"] = f"{min(source_kbps, MP3_LOW_KBPS)}k"
+    output_buffer = BytesIO()
+    audio.export(output_buffer, **export)
+    return output_buffer.getvalue()
+
+
+def adjust_audio_speed(audio_bytes: bytes, speed: float, audio_format: str = "mp3") -> bytes:
+    """
+    Adjust the playback speed of audio without changing its pitch
+    
+    Args:
+        audio_bytes: Original MP3 audio data
         speed: Speed multiplier (0.5 = half speed, 1.0 = normal, 2.0 = double speed)
+        audio_format: Output format (AUDIO_FORMATS name), encoded in the same pass
     
     Returns:
         Modified audio bytes
     """
+    if speed == 1.0 and audio_format == "mp3":
+        return audio_bytes
+    
+    stage, backend = ("speed_adjust", "wsola") if speed != 1.0 else ("encode", audio_format)
     try:
-        # Load audio from bytes
-        audio = AudioSegment.from_file(BytesIO(audio_bytes), format="mp3")
+        with observe_stage(stage, backend, speed=speed):
+            # Load audio from bytes
+            audio = AudioSegment.from_file(BytesIO(audio_bytes), format="mp3")
+            source_kbps = mp3_bitrate_kbps(len(audio_bytes), audio.duration_seconds)
+            if speed == 1.0 and passes_through(audio_format, source_kbps):
+                return audio_bytes
+            
+            if speed != 1.0:
+                # Vectorized WSOLA time stretch on the PCM samples (same pitch for both directions)
+                samples = time_stretch(segment_to_array(audio), audio.frame_rate, speed)
+                audio = array_to_segment(samples, audio)
+            
+            # Export back to bytes
+            return encode_audio(audio, audio_format, source_kbps)
+    
+    except Exception as e:
+        print(f"Error adjusting speed: {str(e)}")
+        # Other formats cannot fall back to the original MP3
+        if audio_format != "mp3":
+            raise
+        # Return original audio if speed adjustment fails
+        return audio_bytes
+
+
+def synthesize_speech(answer_text: str, language: str) -> bytes:
+    """
+    Convert text to MP3 bytes with the configured TTS backend (blocking)
+    
+    Args:
+        answer_text: Text to speak
+        language: TTS language code
+    
+    Returns:
+        MP3 audio bytes
+    """
+    with observe_stage("tts", tts_backend.name, language), upstream_health.track("tts"):
+        audio_bytes = tts_backend.synthesize(answer_text, language)
+    payload_bytes.observe(len(audio_bytes), kind="tts_audio", backend=tts_backend.name, language=language)
+    
+    # Validate audio data
+    if len(audio_bytes) == 0:
+        raise Exception(f"{tts_backend.name} returned empty audio")
+    
+    # The rest of the pipeline works on MP3
+    if tts_backend.output_format != "mp3":
+        with observe_stage("tts_transcode", tts_backend.output_format, language):
+            audio = AudioSegment.from_file(BytesIO(audio_bytes), format=tts_backend.output_format)
+            output_buffer = BytesIO()
+            audio.export(output_buffer, format="mp3")
+            audio_bytes = output_buffer.getvalue()
+    
+    return audio_bytes
+
+
+def transcribe_speech(audio_bytes: bytes, language: str):
+    """
+    Transcribe recorded audio with the configured STT backend (blocking)
+    
+    WAV input is first downmixed to 16 kHz mono and stripped of leading and
+    trailing silence, so the recognizer gets less audio to upload and decode.
+    
+    Args:
+        audio_bytes: WAV/AIFF/FLAC audio, read from memory
+        language: Language code of the speech
+    
+    Returns:
+        Tuple of (transcript or None if no speech was recognized,
+        preprocessing stats or None for non-WAV input)
+    """
+    payload_bytes.observe(len(audio_bytes), kind="upload_audio", backend=stt_backend.name, language=language)
+    try:
+        with observe_stage("stt_preprocess", "numpy", language):
+            audio_bytes, stats = preprocess_speech(audio_bytes)
+    except (wave.Error, EOFError):
+        # AIFF/FLAC go to the recognizer unchanged
+        stats = None
+    
+    if stats is not None:
+        print(f"✂️ Trimmed {stats['trimmed_seconds']}s of silence, "
+              f"{stats['original_kb']} KB → {stats['processed_kb']} KB")
+        if not stats["speech_detected"]:
+            return None, stats
+    
+    audio_data = load_audio(audio_bytes)
+    with observe_stage("stt", stt_backend.name, language), upstream_health.track("stt"):
+        transcript = stt_backend.transcribe(audio_data, language)
+    return transcript, stats
+
+
+def resolve_language(language: str) -> str:
+    """Fall back to English for languages the app or the TTS backend does not support"""
+    if language in SUPPORTED_LANGUAGES and language in tts_backend.languages:
+        return language
+    return "en"
+
+
+def wants_binary_audio(request: Request, response_format: str) -> bool:
+    """Binary audio is requested with response_format=audio or an Accept header naming an audio type"""
+    if response_format == "audio":
+        return True
+    if response_format == "json":
+        accept = request.headers.get("accept", "").lower()
+        return any(media_type in accept for media_type in ACCEPT_AUDIO_FORMATS) and "application/json" not in accept
+    raise HTTPException(status_code=400, detail="response_format must be 'json' or 'audio'")
+
+
+def negotiate_audio_format(request: Request, audio_format: str = None) -> str:
+    """
+    Pick the output audio format: the audio_format field if given, otherwise the
+    audio type in the Accept header with the highest q-value, otherwise MP3
+    """
+    if audio_format:
+        if audio_format not in AUDIO_FORMATS:
+            raise HTTPException(status_code=400, detail=f"audio_format must be one of: {', '.join(AUDIO_FORMATS)}")
+        return audio_format
+    
+    best, best_q = "mp3", 0.0
+    for item in request.headers.get("accept", "").lower().split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        name = ACCEPT_AUDIO_FORMATS.get(media_type)
+        if name is None:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def audio_response(audio_bytes: bytes, metadata: dict) -> Response:
+    """
+    Return raw audio bytes with the answer metadata in X- headers
+    
+    The bytes are handed to the response as-is, so there is no base64 copy
+    and no JSON serialization of the audio.
+    """
+    headers = {
+        header: quote(str(metadata[key]), safe="")
+        for key, header in AUDIO_METADATA_HEADERS.items()
+        if key in metadata
+    }
+    audio_format = AUDIO_FORMATS[metadata.get("audio_format", "mp3")]
+    headers["Content-Disposition"] = f'inline; filename="response.{audio_format["extension"]}"'
+    # The format may have been picked from the Accept header
+    headers["Vary"] = "Accept"
+    return Response(content=audio_bytes, media_type=audio_format["media_type"], headers=headers)
+
+
+def respond_with_audio(binary_audio: bool, audio_bytes: bytes, metadata: dict) -> Response:
+    """Return raw audio with metadata headers, or JSON with base64 audio"""
+    labels = {
+        "backend": metadata.get("tts_engine", ""),
+        "language": metadata.get("language", ""),
+        "speed_bucket": speed_bucket(metadata.get("speed")),
+        "format": metadata.setdefault("audio_format", "mp3")
+    }
+    payload_bytes.observe(len(audio_bytes), kind="response_audio", **labels)
+    
+    if binary_audio:
+        with observe_stage("serialize", "binary", metadata.get("language", ""), metadata.get("speed")):
+            return audio_response(audio_bytes, metadata)
+    
+    # Only the JSON mode pays for base64 encoding
+    with observe_stage("serialize", "json", metadata.get("language", ""), metadata.get("speed")):
+        metadata["audio_mime_type"] = AUDIO_FORMATS[metadata["audio_format"]]["media_type"]
+        metadata["audio_base64"] = base64.b64encode(audio_bytes).decode("utf-8")
+        response = JSONResponse(metadata)
+    payload_bytes.observe(len(response.body), kind="response_body", **labels)
+    return response
+
+
+def render_speed_variant(master: MasterAudio, speed: float, audio_format: str = "mp3") -> bytes:
+    """
+    Derive a speed and format variant from the decoded 1.0x master (blocking, no TTS call)
+    
+    Args:
+        master: The response's 1.0x audio
+        speed: Speed multiplier (0.5 to 2.0)
+        audio_format: Output format (AUDIO_FORMATS name)
+    
+    Returns:
+        Audio bytes at the requested speed, in the requested format
+    """
+    if speed == 1.0 and audio_format == "mp3":
+        return master.mp3
+    
+    stage, backend = ("speed_adjust", "wsola") if speed != 1.0 else ("encode", audio_format)
+    with observe_stage(stage, backend, master.language, speed):
+        audio = master.decoded()
+        master_store.touch()
+        source_kbps = mp3_bitrate_kbps(len(master.mp3), audio.duration_seconds)
+        if speed == 1.0 and passes_through(audio_format, source_kbps):
+            return master.mp3
         
         if speed != 1.0:
-            # Method 1: Change playback speed (recommended)
-            if speed > 1.0:
-                # Speed up
-                audio = speedup(audio, playback_speed=speed)
+            audio = array_to_segment(time_stretch(segment_to_array(audio), audio.frame_rate, speed), audio)
+        return encode_audio(audio, audio_format, source_kbps)
+
+
+def register_master(answer_text: str, language: str, response_id: str, mp3: bytes) -> MasterAudio:
+    """Wrap a 1.0x MP3 as the master for an answer and add it to the master store"""
+    master = MasterAudio(answer_text, language, mp3)
+    master_store.put(response_id, master)
+    return master
+
+
+async def find_master(answer_text: str, language: str, response_id: str, mp3: bytes = None,
+                      check_cache: bool = True):
+    """
+    Return the 1.0x master for an answer without synthesizing it, or None
+    
+    The master comes from the master store, then `mp3` (master bytes the caller
+    already fetched) and, if `check_cache` is set, the TTS cache. The cache lookup
+    is a peek: the caller has already counted its own lookup for this request.
+    """
+    master = master_store.get(response_id)
+    if master is not None:
+        return master
+    
+    if mp3 is None and check_cache:
+        mp3 = tts_cache.get_memory(response_id, count=False)
+        if mp3 is None and tts_cache.disk_dir:
+            mp3 = await run_blocking(tts_cache.get_disk, response_id, count=False)
+    if mp3 is None:
+        return None
+    return register_master(answer_text, language, response_id, mp3)
+
+
+async def answer_and_speak_once(question: str, speed: float, language: str, use_cache: bool = True,
+                                session: ConversationSession = None, audio_format: str = "mp3"):
+    """
+    answer_and_speak, shared between concurrent identical requests
+    
+    Requests with the same question, speed, language, format and model settings that
+    arrive while one is in flight await its result instead of calling the LLM
+    and TTS again. use_cache=False and session requests always run on their own.
+    
+    Returns:
+        Tuple of (a copy of the response metadata, audio bytes)
+    """
+    if not use_cache or session is not None:
+        return await answer_and_speak(question, speed, language, use_cache, session, audio_format)
+    
+    flight_key = hashlib.sha256(
+        f"{answer_cache_key(question, LLM_MODEL, LLM_MAX_TOKENS, LLM_TEMPERATURE)}"
+        f"\x00{language}\x00{round(speed, 2)}\x00{audio_format}".encode("utf-8")
+    ).hexdigest()
+    metadata, audio_bytes = await ask_flight.run(
+        flight_key, lambda: answer_and_speak(question, speed, language, use_cache, audio_format=audio_format)
+    )
+    # Each caller adds its own fields (base64 audio, transcript) to the metadata
+    metadata = dict(metadata)
+    # The flight key normalizes the question, so the leader may have typed it differently
+    metadata["your_question"] = question
+    return metadata, audio_bytes
+
+
+async def answer_and_speak(question: str, speed: float, language: str, use_cache: bool = True,
+                           session: ConversationSession = None, audio_format: str = "mp3"):
+    """
+    Generate the AI answer for a question and its audio at the requested speed
+    
+    Args:
+        question: The text question to ask the AI
+        speed: Audio playback speed (already validated)
+        language: TTS language code (already resolved)
+        use_cache: Reuse a cached answer for the same question
+        session: Conversation the question belongs to, if any
+        audio_format: Output format (AUDIO_FORMATS name, already negotiated)
+    
+    Returns:
+        Tuple of (response metadata, audio bytes)
+    """
+    # -----------------------------
+    # 1️⃣ Generate answer using Groq LLM
+    # -----------------------------
+    try:
+        print(f"📝 Processing question: {question[:50]}...")
+        print(f"🎚️ Speed: {speed}x | Language: {language}")
+        
+        answer_text, answer_cached = await generate_answer(question, use_cache, session)
+        if answer_cached:
+            print("♻️ Answer cache hit, skipping Groq")
+        print(f"✅ LLM Response: {answer_text[:100]}...")
+        
+    except Overloaded:
+        raise
+    except Exception as e:
+        print(f"❌ Groq LLM Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Groq LLM failed: {str(e)}")
+
+    # -----------------------------
+    # 2️⃣ Convert answer to speech using the TTS backend
+    # -----------------------------
+    try:
+        # The 1.0x master's cache key doubles as the response id for /respeed
+        response_id = tts_cache_key(answer_text, language, 1.0)
+        
+        # Same text, language, speed and format always produce the same audio
+        cache_key = tts_cache_key(answer_text, language, speed, audio_format)
+        audio_bytes = await cache_get(tts_cache, cache_key)
+        # At 1.0x MP3 the lookup above was for the master itself
+        is_master = cache_key == response_id
+        
+        if audio_bytes is not None:
+            print("♻️ TTS cache hit, skipping TTS and speed adjustment")
+            # Keep /respeed working when the master is still cached, never call TTS here
+            await find_master(answer_text, language, response_id, audio_bytes if is_master else None)
+        else:
+            print(f"🎙️ Generating speech with {tts_backend.name}...")
+            
+            # Always synthesize at 1.0x; every other speed is derived from this master
+            master = await find_master(answer_text, language, response_id, check_cache=not is_master)
+            if master is None:
+                # TTS is a blocking call (HTTP for gTTS), keep it off the event loop
+                mp3 = await run_stage("tts", synthesize_speech, answer_text, language)
+                await cache_put(tts_cache, response_id, mp3)
+                master = register_master(answer_text, language, response_id, mp3)
+            
+            print(f"✅ Initial audio generated: {len(master.mp3) / 1024:.2f} KB")
+            
+            # Adjust speed and/or encode to the requested format, in one pass
+            if speed != 1.0 or audio_format != "mp3":
+                print(f"⚡ Rendering {speed}x {audio_format} audio...")
+                audio_bytes = await run_stage("transcode", render_speed_variant, master, speed, audio_format)
+                print(f"✅ Rendered audio: {len(audio_bytes) / 1024:.2f} KB")
+                await cache_put(tts_cache, cache_key, audio_bytes)
             else:
-                # Slow down by changing frame rate
-                audio = audio._spawn(audio.raw_data, overrides={
-                    "frame_rate": int(audio.frame_rate * speed)
-                })
-                audio = audio.set_frame_rate(audio.frame_rate)
+                audio_bytes = master.mp3
         
-        # Export back to bytes
-        output_buffer = BytesIO()
-        audio.export(output_buffer, format="mp3")
-        output_buffer.seek(0)
+        print(f"✅ Audio generated successfully!")
+        print(f"   Final audio size: {len(audio_bytes) / 1024:.2f} KB")
         
-        return output_buffer.read()
-    
+    except Overloaded:
+        raise
     except Exception as e:
-        print(f"Error adjusting speed: {str(e)}")
-        # Return original audio if speed adjustment fails
-        return audio_bytes
+        print(f"❌ TTS Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"TTS failed: {str(e)}")
+
+    metadata = {
+        "success": True,
+        "your_question": question,
+        "ai_answer": answer_text,
+        "audio_size_kb": round(len(audio_bytes) / 1024, 2),
+        "tts_engine": tts_backend.name,
+        "speed": speed,
+        "language": language,
+        "language_name": SUPPORTED_LANGUAGES.get(language, "English"),
+        "audio_format": audio_format,
+        "answer_cached": answer_cached,
+        "response_id": response_id
+    }
+    if session is not None:
+        metadata["session_id"] = session.session_id
+    return metadata, audio_bytes
 
 
 @app.get("/")
@@ -79,25 +1426,138 @@ async def root():
         "message": "Text-to-Speech API is running!",
         "endpoints": {
             "/ask": "POST - Generate text and audio from a question",
-            "/health": "GET - Check API health"
+            "/ask/stream": "POST - Stream sentence-by-sentence audio as Server-Sent Events",
+            "/respeed/{response_id}": "GET - Re-render a previous answer at another speed",
+            "/transcribe": "POST - Convert recorded speech (WAV) to text",
+            "/ask/audio": "POST - Transcribe a recording, answer it and return speech in one call",
+            "/ws/voice": "WebSocket - Full-duplex voice session with barge-in",
+            "/sessions": "POST - Start a conversation with server-side history (GET/DELETE /sessions/{id})",
+            "/health": "GET - Check API health",
+            "/metrics": "GET - Prometheus metrics"
         }
     }
 
 
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    """
+    Latency (to response headers) and in-flight count per route template
+    
+    Also opens the request's root span (except for UNTRACED_PATHS), continuing
+    the caller's trace when a traceparent header is sent, and returns its id in X-Trace-Id.
+    """
+    start = time.perf_counter()
+    status = 500
+    if request.url.path in UNTRACED_PATHS:
+        root_span = nullcontext()
+    else:
+        root_span = tracer.span(f"{request.method} {request.url.path}", request.headers.get(TRACEPARENT_HEADER))
+    with http_in_flight.track_inprogress(), root_span as span:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            if span is not None:
+                response.headers["X-Trace-Id"] = span.trace_id
+            return response
+        finally:
+            route = request.scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            if span is not None:
+                span.name = f"{request.method} {route_path}"
+                span.set(status=status)
+            http_seconds.observe(
+                time.perf_counter() - start,
+                route=route_path,
+                method=request.method,
+                status=status
+            )
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of stage latencies, payload sizes, caches and admission"""
+    for name, stats in (("tts", tts_cache.stats()), ("answer", answer_cache.stats())):
+        cache_hits.set_total(stats["hits"], cache=name)
+        cache_misses.set_total(stats["misses"], cache=name)
+        cache_hit_ratio.set(stats["hit_ratio"], cache=name)
+        cache_entries.set(stats["entries"], cache=name)
+    cache_entries.set(master_store.stats()["entries"], cache="master")
+    for stage, gate in admission.items():
+        admission_active.set(gate.active, stage=stage)
+        admission_waiting.set(gate.waiting, stage=stage)
+        admission_rejected.set_total(gate.rejected + gate.timed_out, stage=stage)
+    for flight in (ask_flight, llm_flight):
+        coalesced_calls.set_total(flight.coalesced, flight=flight.name)
+    active_sessions.set(session_store.stats()["sessions"])
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/health")
 async def health():
     return {
         "status": "healthy", 
-        "tts_engine": "gTTS (Google Text-to-Speech)",
-        "features": ["speed_control", "multiple_languages"]
+        "upstreams": upstream_health.snapshot(),
+        "tts_engine": tts_backend.name,
+        "tts_backend": tts_backend.capabilities(),
+        "stt_backend": stt_backend.capabilities(),
+        "features": ["speed_control", "multiple_languages", "streaming"],
+        "tts_cache": tts_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "master_store": master_store.stats(),
+        "coalescing": {"ask": ask_flight.stats(), "llm": llm_flight.stats()},
+        "sessions": session_store.stats(),
+        "admission": {stage: gate.stats() for stage, gate in admission.items()}
     }
 
 
+def get_session(session_id: str):
+    """Look up the session a request belongs to; None when the request has no session_id"""
+    if not session_id:
+        return None
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return session
+
+
+@app.post("/sessions")
+async def create_session(system: str = Form("")):
+    """
+    Start a conversation whose history is kept on the server
+    
+    Args:
+        system: System prompt for the whole conversation (e.g. the interview brief)
+    
+    Returns:
+        JSON with the session_id to pass to /ask, /ask/stream and /ask/audio
+    """
+    session = session_store.create(system.strip())
+    return {"session_id": session.session_id, "token_budget": SESSION_TOKEN_BUDGET}
+
+
+@app.get("/sessions/{session_id}")
+async def read_session(session_id: str):
+    """Return a session's system prompt, summary and recent turns"""
+    return get_session(session_id).info()
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"success": True}
+
+
 @app.post("/ask")
 async def ask(
+    request: Request,
     question: str = Form(...),
     speed: float = Form(1.0),
-    language: str = Form("en")
+    language: str = Form("en"),
+    use_cache: bool = Form(True),
+    response_format: str = Form("json"),
+    session_id: str = Form(None),
+    audio_format: str = Form(None)
 ):
     """
     Generate AI response and convert to speech with speed control
@@ -106,112 +1566,712 @@ async def ask(
         question: The text question to ask the AI
         speed: Audio playback speed (0.5 to 2.0, default 1.0)
         language: TTS language code (en, bn, hi, es, fr, etc.)
+        use_cache: Reuse a cached answer for the same question (False for a fresh answer)
+        response_format: "json" (base64 audio inside JSON) or "audio" (raw audio/mpeg
+            body with percent-encoded metadata in X- headers). Accept: audio/mpeg also
+            selects binary audio.
+        session_id: Answer as the next turn of a /sessions conversation (answers are not cached)
+        audio_format: "mp3" (default), "mp3_low", "ogg_opus", "webm_opus" or "pcm"
+            (audio/L16). Without it the audio type in the Accept header is used.
     
     Returns:
-        JSON with question, AI answer, and base64 encoded audio
+        JSON with question, AI answer, and base64 encoded audio, or the audio itself
     """
     if not question.strip():
         raise HTTPException(status_code=400, detail="Please provide a question")
     
+    binary_audio = wants_binary_audio(request, response_format)
+    audio_format = negotiate_audio_format(request, audio_format)
+    
     # Validate speed
     if speed < 0.5 or speed > 2.0:
         raise HTTPException(status_code=400, detail="Speed must be between 0.5 and 2.0")
 
     # Validate language
-    supported_languages = {
-        "en": "English",
-        "bn": "Bengali", 
-        "hi": "Hindi",
-        "es": "Spanish",
-        "fr": "French",
-        "de": "German",
-        "it": "Italian",
-        "ja": "Japanese",
-        "ko": "Korean",
-        "zh": "Chinese"
+    language = resolve_language(language)  # Default to English
+    
+    session = get_session(session_id)
+
+    with tracer.span("ask", speed=speed, language=language, question_chars=len(question),
+                     session=session is not None, audio_format=audio_format) as span:
+        metadata, audio_bytes = await answer_and_speak_once(question, speed, language, use_cache, session,
+                                                            audio_format)
+        span.set(answer_cached=metadata["answer_cached"], audio_bytes=len(audio_bytes))
+
+        # -----------------------------
+        # 3️⃣ Return both text + audio
+        # -----------------------------
+        return respond_with_audio(binary_audio, audio_bytes, metadata)
+
+
+@app.get("/respeed/{response_id}")
+async def respeed(
+    request: Request,
+    response_id: str,
+    speed: float,
+    response_format: str = "audio",
+    audio_format: str = None
+):
+    """
+    Re-render a previous /ask answer at another speed from its cached 1.0x master
+    
+    No LLM or TTS call is made: the variant is a local time stretch of the
+    decoded master, and is cached like any other synthesized audio.
+    
+    Args:
+        response_id: The response_id returned by /ask
+        speed: Audio playback speed (0.5 to 2.0)
+        response_format: "audio" (raw audio, default) or "json" (base64 audio)
+        audio_format: Output format as in /ask, or from the Accept header
+    
+    Returns:
+        The audio at the new speed, or JSON with base64 encoded audio
+    """
+    if speed < 0.5 or speed > 2.0:
+        raise HTTPException(status_code=400, detail="Speed must be between 0.5 and 2.0")
+    
+    binary_audio = wants_binary_audio(request, response_format)
+    audio_format = negotiate_audio_format(request, audio_format)
+    
+    master = master_store.get(response_id)
+    if master is None:
+        raise HTTPException(status_code=404, detail="Response audio has expired, please ask again")
+    
+    cache_key = tts_cache_key(master.answer_text, master.language, speed, audio_format)
+    audio_bytes = await cache_get(tts_cache, cache_key)
+    if audio_bytes is None:
+        print(f"⚡ Deriving {speed}x {audio_format} variant of {response_id[:12]}...")
+        try:
+            audio_bytes = await run_stage("transcode", render_speed_variant, master, speed, audio_format)
+        except Overloaded:
+            raise
+        except Exception as e:
+            print(f"❌ Respeed Error: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Speed adjustment failed: {str(e)}")
+        await cache_put(tts_cache, cache_key, audio_bytes)
+    
+    metadata = {
+        "success": True,
+        "ai_answer": master.answer_text,
+        "audio_size_kb": round(len(audio_bytes) / 1024, 2),
+        "speed": speed,
+        "language": master.language,
+        "language_name": SUPPORTED_LANGUAGES.get(master.language, "English"),
+        "audio_format": audio_format,
+        "response_id": response_id
     }
+    return respond_with_audio(binary_audio, audio_bytes, metadata)
+
+
+@app.post("/transcribe")
+async def transcribe(
+    audio: UploadFile = File(...),
+    language: str = Form("en")
+):
+    """
+    Convert recorded speech to text with the configured STT backend
+    
+    Args:
+        audio: WAV (or AIFF/FLAC) recording, e.g. from audio_recorder
+        language: Language code of the speech (en, bn, hi, es, fr, etc.)
+    
+    Returns:
+        JSON with the transcript (null when no speech was recognized)
+    """
+    audio_bytes = await audio.read()
+    if not audio_bytes:
+        raise HTTPException(status_code=400, detail="Please provide an audio recording")
+    
+    if language not in stt_backend.languages:
+        language = "en"
+    
+    try:
+        print(f"🎧 Transcribing {len(audio_bytes) / 1024:.2f} KB with {stt_backend.name}...")
+        transcript, preprocessing = await run_stage("stt", transcribe_speech, audio_bytes, language)
+    except Overloaded:
+        raise
+    except ValueError as e:
+        # SpeechRecognition raises ValueError for unreadable audio
+        raise HTTPException(status_code=400, detail=f"Unsupported audio: {str(e)}")
+    except Exception as e:
+        print(f"❌ STT Error: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"Speech recognition failed: {str(e)}")
     
-    if language not in supported_languages:
-        language = "en"  # Default to English
+    print(f"✅ Transcript: {(transcript or '')[:100]}")
+    return JSONResponse({
+        "success": transcript is not None,
+        "transcript": transcript,
+        "stt_engine": stt_backend.name,
+        "language": language,
+        "audio_preprocessing": preprocessing
+    })
 
-    # -----------------------------
-    # 1️⃣ Generate answer using Groq LLM
-    # -----------------------------
+
+async def stream_llm_sentences(messages: list, answer_parts: list):
+    """
+    Stream a Groq completion and yield complete sentences as soon as they are generated
+    
+    The raw text deltas are appended to `answer_parts` for the caller to keep.
+    The LLM admission slot is held until the stream is finished.
+    """
+    async with admission["llm"].slot():
+        stream = await llm_completion(messages, stream=True)
+        
+        pending = ""
+        with observe_stage("llm_stream", LLM_MODEL):
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                answer_parts.append(delta)
+                pending += delta
+                
+                # Everything before the last boundary is a finished sentence
+                parts = SENTENCE_END.split(pending)
+                for sentence in parts[:-1]:
+                    if sentence.strip():
+                        yield sentence.strip()
+                pending = parts[-1]
+    
+    if pending.strip():
+        yield pending.strip()
+
+
+async def stream_sentences(question: str, use_cache: bool = True, session: ConversationSession = None):
+    """
+    Stream the answer to a question one complete sentence at a time
+    
+    Args:
+        question: The text question to ask the AI
+        use_cache: Replay a cached answer for the same question instead of calling Groq
+        session: Answer as the next turn of this conversation (never cached)
+    
+    Yields:
+        One sentence of the answer at a time
+    """
+    answer_parts = []
+    if session is not None:
+        async with session.lock:
+            async for sentence in stream_llm_sentences(session.messages(question), answer_parts):
+                yield sentence
+            session.add_turn(question, "".join(answer_parts))
+        schedule_compaction(session)
+        return
+    
+    cache_key = answer_cache_key(question, LLM_MODEL, LLM_MAX_TOKENS, LLM_TEMPERATURE)
+    if use_cache:
+        answer_text = answer_cache.get(cache_key)
+        if answer_text is not None:
+            for sentence in SENTENCE_END.split(answer_text):
+                if sentence.strip():
+                    yield sentence.strip()
+            return
+    
+    async for sentence in stream_llm_sentences([{"role": "user", "content": question}], answer_parts):
+        yield sentence
+    
+    answer_cache.put(cache_key, "".join(answer_parts))
+
+
+def synthesize_chunk(sentence: str, language: str, speed: float, audio_format: str = "mp3") -> bytes:
+    """Synthesize one sentence at the requested speed and format and store it in the TTS cache (blocking)"""
+    audio_bytes = synthesize_speech(sentence, language)
+    if speed != 1.0 or audio_format != "mp3":
+        audio_bytes = adjust_audio_speed(audio_bytes, speed, audio_format)
+    
+    tts_cache.put(tts_cache_key(sentence, language, speed, audio_format), audio_bytes)
+    return audio_bytes
+
+
+async def sentence_chunk_audio(sentence: str, language: str, speed: float, audio_format: str = "mp3") -> bytes:
+    """Audio for one streamed sentence; cache hits never wait for the TTS gate or its workers"""
+    audio_bytes = await cache_get(tts_cache, tts_cache_key(sentence, language, speed, audio_format))
+    if audio_bytes is not None:
+        return audio_bytes
+    return await run_stage("tts", synthesize_chunk, sentence, language, speed, audio_format)
+
+
+def sse_event(event: str, payload: dict) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+async def sentence_audio_stream(question: str, speed: float, language: str, use_cache: bool = True,
+                                session: ConversationSession = None, audio_format: str = "mp3"):
+    """
+    Pipeline the LLM stream into TTS, one sentence at a time
+    
+    TTS for a sentence starts as soon as it is complete while the LLM keeps
+    generating. Closing or cancelling the consumer stops the LLM stream and
+    drops the TTS work that has not started.
+    
+    Yields:
+        Tuples of (index, sentence, audio bytes) in answer order
+    """
+    # In-order queue of running TTS tasks, None marks the end of the LLM stream
+    tts_tasks = asyncio.Queue()
+    
+    async def produce():
+        try:
+            async for sentence in stream_sentences(question, use_cache, session):
+                task = asyncio.ensure_future(sentence_chunk_audio(sentence, language, speed, audio_format))
+                await tts_tasks.put((sentence, task))
+        finally:
+            await tts_tasks.put(None)
+    
+    producer = asyncio.ensure_future(produce())
+    index = 0
     try:
-        print(f"📝 Processing question: {question[:50]}...")
-        print(f"🎚️ Speed: {speed}x | Language: {language}")
+        while True:
+            item = await tts_tasks.get()
+            if item is None:
+                break
+            sentence, task = item
+            yield index, sentence, await task
+            index += 1
         
-        llm_response = groq_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": question}],
-            max_tokens=200,
-            temperature=0.7
-        )
-        answer_text = llm_response.choices[0].message.content
-        print(f"✅ LLM Response: {answer_text[:100]}...")
+        # Surface LLM errors raised after the last sentence
+        await producer
+    finally:
+        # Client disconnected, barged in or something failed: stop the LLM and drop pending TTS
+        producer.cancel()
+        while not tts_tasks.empty():
+            item = tts_tasks.get_nowait()
+            if item is not None:
+                item[1].cancel()
+
+
+async def sentence_audio_events(question: str, speed: float, language: str, use_cache: bool = True,
+                                session: ConversationSession = None, audio_format: str = "mp3"):
+    """
+    Yield SSE `audio` events per sentence while the LLM is still generating,
+    then a `done` event with the full answer (or an `error` event)
+    """
+    sentences = []
+    try:
+        async for index, sentence, audio_bytes in sentence_audio_stream(question, speed, language, use_cache,
+                                                                        session, audio_format):
+            sentences.append(sentence)
+            payload_bytes.observe(
+                len(audio_bytes), kind="stream_audio", backend=tts_backend.name,
+                language=language, speed_bucket=speed_bucket(speed), format=audio_format
+            )
+            with observe_stage("serialize", "sse", language, speed):
+                event = sse_event("audio", {
+                    "index": index,
+                    "text": sentence,
+                    "audio_base64": base64.b64encode(audio_bytes).decode("utf-8"),
+                    "audio_mime_type": AUDIO_FORMATS[audio_format]["media_type"],
+                    "audio_size_kb": round(len(audio_bytes) / 1024, 2)
+                })
+            yield event
         
+        print(f"✅ Streamed {len(sentences)} audio chunks")
+        yield sse_event("done", {
+            "success": True,
+            "your_question": question,
+            "ai_answer": " ".join(sentences),
+            "chunks": len(sentences),
+            "tts_engine": tts_backend.name,
+            "speed": speed,
+            "language": language,
+            "language_name": SUPPORTED_LANGUAGES.get(language, "English"),
+            "audio_format": audio_format,
+            "session_id": session.session_id if session is not None else None
+        })
+    except Overloaded as e:
+        print(f"⏳ Streaming rejected: {str(e)}")
+        yield sse_event("error", {"detail": str(e), "status": e.status_code, "retry_after": e.retry_after})
     except Exception as e:
-        print(f"❌ Groq LLM Error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Groq LLM failed: {str(e)}")
+        print(f"❌ Streaming Error: {str(e)}")
+        yield sse_event("error", {"detail": str(e)})
 
+
+@app.post("/ask/stream")
+async def ask_stream(
+    question: str = Form(...),
+    speed: float = Form(1.0),
+    language: str = Form("en"),
+    use_cache: bool = Form(True),
+    session_id: str = Form(None),
+    audio_format: str = Form("mp3")
+):
+    """
+    Stream the AI response as audio chunks, one per sentence
+    
+    The LLM is streamed and cut at sentence boundaries. TTS for each sentence
+    starts as soon as the sentence is complete while the LLM keeps generating,
+    so the first audio arrives after roughly one sentence instead of the whole answer.
+    
+    Args:
+        question: The text question to ask the AI
+        speed: Audio playback speed (0.5 to 2.0, default 1.0)
+        language: TTS language code (en, bn, hi, es, fr, etc.)
+        use_cache: Reuse a cached answer for the same question (False for a fresh answer)
+        session_id: Answer as the next turn of a /sessions conversation
+        audio_format: Format of each sentence's audio, as in /ask (each chunk is a complete file)
+    
+    Returns:
+        text/event-stream with `audio` events (index, text, audio_base64, audio_mime_type),
+        then a final `done` event with the full answer, or an `error` event
+    """
+    if not question.strip():
+        raise HTTPException(status_code=400, detail="Please provide a question")
+    
+    if speed < 0.5 or speed > 2.0:
+        raise HTTPException(status_code=400, detail="Speed must be between 0.5 and 2.0")
+    
+    if audio_format not in AUDIO_FORMATS:
+        raise HTTPException(status_code=400, detail=f"audio_format must be one of: {', '.join(AUDIO_FORMATS)}")
+    
+    language = resolve_language(language)
+    session = get_session(session_id)
+    
+    print(f"📝 Streaming question: {question[:50]}...")
+    
+    return StreamingResponse(
+        sentence_audio_events(question, speed, language, use_cache, session, audio_format),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/ask/audio")
+async def ask_audio(
+    request: Request,
+    audio: UploadFile = File(...),
+    speed: float = Form(1.0),
+    language: str = Form("en"),
+    use_cache: bool = Form(True),
+    response_format: str = Form("json"),
+    prompt: str = Form("{transcript}"),
+    stream: bool = Form(False),
+    session_id: str = Form(None),
+    audio_format: str = Form(None)
+):
+    """
+    One voice turn in one round trip: transcribe, answer and speak
+    
+    Args:
+        audio: WAV recording from audio_recorder
+        speed: Audio playback speed (0.5 to 2.0, default 1.0)
+        language: Language of the speech and of the TTS answer
+        use_cache: Reuse a cached answer for the same question (False for a fresh answer)
+        response_format: "json" (base64 audio inside JSON) or "audio" (raw audio/mpeg
+            with metadata, including the transcript, in X- headers)
+        prompt: Question sent to the LLM, `{transcript}` is replaced by the transcript
+            (e.g. interview context around the candidate's answer)
+        stream: Send Server-Sent Events instead: a `transcript` event, then sentence
+            `audio` events as in /ask/stream, so TTS overlaps with generation
+        session_id: Answer as the next turn of a /sessions conversation
+        audio_format: Output format as in /ask, or from the Accept header
+    
+    Returns:
+        JSON (or raw audio / event stream) with transcript, AI answer and audio
+    """
+    audio_bytes = await audio.read()
+    if not audio_bytes:
+        raise HTTPException(status_code=400, detail="Please provide an audio recording")
+    
+    binary_audio = wants_binary_audio(request, response_format)
+    audio_format = negotiate_audio_format(request, audio_format)
+    
+    if speed < 0.5 or speed > 2.0:
+        raise HTTPException(status_code=400, detail="Speed must be between 0.5 and 2.0")
+    
+    language = resolve_language(language)
+    session = get_session(session_id)
+    
     # -----------------------------
-    # 2️⃣ Convert answer to speech using gTTS
+    # 1️⃣ Speech to text
     # -----------------------------
     try:
-        print("🎙️ Generating speech with gTTS...")
-        
-        # Check if we should use slow mode for gTTS
-        use_slow_mode = speed < 0.8
-        
-        # Create gTTS object
-        tts = gTTS(text=answer_text, lang=language, slow=use_slow_mode)
-        
-        # Save to BytesIO buffer
-        audio_buffer = BytesIO()
-        tts.write_to_fp(audio_buffer)
-        
-        # Get audio bytes
-        audio_buffer.seek(0)
-        audio_bytes = audio_buffer.read()
-        
-        # Validate audio data
-        if len(audio_bytes) == 0:
-            raise Exception("gTTS returned empty audio")
-        
-        print(f"✅ Initial audio generated: {len(audio_bytes) / 1024:.2f} KB")
-        
-        # Adjust speed if needed (and if not using gTTS slow mode)
-        if speed != 1.0 and not use_slow_mode:
-            print(f"⚡ Adjusting audio speed to {speed}x...")
-            audio_bytes = adjust_audio_speed(audio_bytes, speed)
-            print(f"✅ Speed-adjusted audio: {len(audio_bytes) / 1024:.2f} KB")
-        
-        # Encode to base64
-        audio_b64 = base64.b64encode(audio_bytes).decode("utf-8")
-        
-        print(f"✅ Audio generated successfully!")
-        print(f"   Final audio size: {len(audio_bytes) / 1024:.2f} KB")
-        
+        print(f"🎧 Transcribing {len(audio_bytes) / 1024:.2f} KB with {stt_backend.name}...")
+        stt_language = language if language in stt_backend.languages else "en"
+        transcript, preprocessing = await run_stage("stt", transcribe_speech, audio_bytes, stt_language)
+    except Overloaded:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Unsupported audio: {str(e)}")
     except Exception as e:
-        print(f"❌ TTS Error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"TTS failed: {str(e)}")
-
+        print(f"❌ STT Error: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"Speech recognition failed: {str(e)}")
+    
+    if not transcript:
+        raise HTTPException(status_code=422, detail="Could not understand the audio")
+    
+    print(f"✅ Transcript: {transcript[:100]}")
+    question = prompt.replace("{transcript}", transcript)
+    
     # -----------------------------
-    # 3️⃣ Return both text + audio
+    # 2️⃣ + 3️⃣ Answer and speech
     # -----------------------------
-    return JSONResponse({
-        "success": True,
-        "your_question": question,
-        "ai_answer": answer_text,
-        "audio_base64": audio_b64,
-        "audio_size_kb": round(len(audio_bytes) / 1024, 2),
-        "tts_engine": "gTTS",
-        "speed": speed,
-        "language": language,
-        "language_name": supported_languages.get(language, "English")
-    })
+    if stream:
+        async def event_stream():
+            yield sse_event("transcript", {"transcript": transcript, "stt_engine": stt_backend.name})
+            async for event in sentence_audio_events(question, speed, language, use_cache, session, audio_format):
+                yield event
+        
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    metadata, answer_audio = await answer_and_speak_once(question, speed, language, use_cache, session, audio_format)
+    metadata["transcript"] = transcript
+    metadata["stt_engine"] = stt_backend.name
+    metadata["audio_preprocessing"] = preprocessing
+    if preprocessing:
+        metadata["stt_trimmed_seconds"] = preprocessing["trimmed_seconds"]
+        metadata["stt_saved_kb"] = preprocessing["saved_kb"]
+    return respond_with_audio(binary_audio, answer_audio, metadata)
 
 
+class VoiceSession:
+    """
+    One full-duplex voice conversation over a WebSocket
+    
+    Client → server:
+        text  {"type": "start", "sample_rate": 16000, "language": "en", "speed": 1.0,
+               "prompt": "{transcript}", "speech_db": -40,
+               "audio_format": "mp3"}                 (optional, first message)
+        bytes raw 16-bit little-endian mono PCM frames from the microphone
+        text  {"type": "end_of_utterance"}   force the current utterance to be answered
+        text  {"type": "cancel"}             stop the current answer (manual barge-in)
+    
+    Server → client:
+        {"type": "ready", ...}                            session settings
+        {"type": "speech_start"} / {"type": "speech_end"}  VAD events
+        {"type": "transcript", "text": ..., "final": bool} partial and final transcripts
+        {"type": "audio", "index": n, "text": ..., "format": <audio_format>, "size": bytes}
+            followed by one binary message with that sentence's audio in that format
+            ("mp3", "mp3_low", "ogg_opus", "webm_opus" or "pcm", see AUDIO_FORMATS)
+        {"type": "done", "ai_answer": ...}
+        {"type": "cancelled", "reason": "barge_in" | "client" | "new_utterance"}
+        {"type": "error", "detail": ...}
+    
+    Speech that starts while an answer is being generated or spoken cancels
+    the in-flight LLM and TTS work (barge-in).
+    """
+    
+    # Seconds of new speech between partial transcripts, 0 disables them
+    PARTIAL_INTERVAL = float(os.getenv("WS_PARTIAL_INTERVAL", "1.0"))
+    # Keep a little audio from before the VAD fired so first syllables are not clipped
+    PRE_ROLL_SECONDS = 0.3
+    # Hard cap on a single utterance
+    MAX_UTTERANCE_SECONDS = 60
+    # Accepted microphone sample rates, out-of-range values are clamped
+    MIN_SAMPLE_RATE = 8000
+    MAX_SAMPLE_RATE = 48000
+    
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.sample_rate = 16000
+        self.language = "en"
+        self.speed = 1.0
+        self.audio_format = "mp3"
+        self.prompt = "{transcript}"
+        self.vad = StreamingVAD(self.sample_rate)
+        self.utterance = bytearray()
+        self.pre_roll = bytearray()
+        self.partial_mark = 0
+        self.partial_task = None
+        self.response_task = None
+        self._send_lock = asyncio.Lock()
+    
+    async def send_json(self, payload: dict):
+        # Responses and partial transcripts are sent from different tasks
+        async with self._send_lock:
+            await self.websocket.send_json(payload)
+    
+    async def send_audio(self, payload: dict, audio_bytes: bytes):
+        # Header and bytes must not be interleaved with other messages
+        async with self._send_lock:
+            await self.websocket.send_json(payload)
+            await self.websocket.send_bytes(audio_bytes)
+    
+    def configure(self, message: dict):
+        """
+        Apply a start message
+        
+        Raises ValueError or TypeError for malformed values, before any setting is changed.
+        """
+        sample_rate = int(message.get("sample_rate", self.sample_rate))
+        sample_rate = min(self.MAX_SAMPLE_RATE, max(self.MIN_SAMPLE_RATE, sample_rate))
+        language = resolve_language(message.get("language", self.language))
+        speed = min(2.0, max(0.5, float(message.get("speed", self.speed))))
+        speech_db = float(message.get("speech_db", -40.0))
+        prompt = message.get("prompt", self.prompt)
+        if not isinstance(prompt, str):
+            raise TypeError("prompt must be a string")
+        audio_format = message.get("audio_format", self.audio_format)
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"audio_format must be one of: {', '.join(AUDIO_FORMATS)}")
+        
+        self.sample_rate = sample_rate
+        self.language = language
+        self.speed = speed
+        self.prompt = prompt
+        self.audio_format = audio_format
+        self.vad = StreamingVAD(self.sample_rate, speech_db=speech_db)
+    
+    async def run(self):
+        await self.websocket.accept()
+        await self.send_json({
+            "type": "ready",
+            "sample_rate": self.sample_rate,
+            "language": self.language,
+            "speed": self.speed,
+            "audio_format": self.audio_format,
+            "stt_engine": stt_backend.name,
+            "tts_engine": tts_backend.name
+        })
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    await self.on_audio(message["bytes"])
+                elif message.get("text") is not None:
+                    try:
+                        control = json.loads(message["text"])
+                    except ValueError:
+                        control = None
+                    if not isinstance(control, dict):
+                        await self.send_json({"type": "error", "detail": "Control messages must be JSON objects"})
+                        continue
+                    await self.on_control(control)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.cancel_tasks()
+    
+    async def on_control(self, message: dict):
+        kind = message.get("type")
+        if kind == "start":
+            try:
+                self.configure(message)
+            except (ValueError, TypeError) as e:
+                await self.send_json({"type": "error", "detail": f"Invalid start message: {str(e)}"})
+                return
+            await self.send_json({"type": "ready", "sample_rate": self.sample_rate,
+                                  "language": self.language, "speed": self.speed,
+                                  "audio_format": self.audio_format})
+        elif kind == "end_of_utterance":
+            self.vad.reset()
+            await self.finish_utterance()
+        elif kind == "cancel":
+            if self.cancel_response():
+                await self.send_json({"type": "cancelled", "reason": "client"})
+    
+    async def on_audio(self, pcm: bytes):
+        for event in self.vad.feed(pcm):
+            if event == "start":
+                await self.send_json({"type": "speech_start"})
+                # Barge-in: the user talks over the answer
+                if self.cancel_response():
+                    await self.send_json({"type": "cancelled", "reason": "barge_in"})
+                self.utterance = bytearray(self.pre_roll)
+                self.partial_mark = 0
+            elif event == "end":
+                await self.send_json({"type": "speech_end"})
+                self.utterance.extend(pcm)
+                await self.finish_utterance()
+                return
+        
+        if self.vad.in_speech:
+            self.utterance.extend(pcm)
+            if len(self.utterance) >= self.MAX_UTTERANCE_SECONDS * self.sample_rate * 2:
+                await self.finish_utterance()
+            else:
+                self.maybe_partial_transcript()
+        else:
+            # Rolling pre-roll buffer of 16-bit samples
+            self.pre_roll.extend(pcm)
+            del self.pre_roll[:-int(self.PRE_ROLL_SECONDS * self.sample_rate) * 2]
+    
+    def maybe_partial_transcript(self):
+        if self.PARTIAL_INTERVAL <= 0 or (self.partial_task and not self.partial_task.done()):
+            return
+        if len(self.utterance) - self.partial_mark < self.PARTIAL_INTERVAL * self.sample_rate * 2:
+            return
+        self.partial_mark = len(self.utterance)
+        self.partial_task = asyncio.ensure_future(self.partial_transcript(bytes(self.utterance)))
+    
+    async def partial_transcript(self, pcm: bytes):
+        try:
+            wav = pcm_to_wav(pcm, self.sample_rate)
+            transcript, _ = await run_stage("stt", transcribe_speech, wav, self.language)
+            if transcript:
+                await self.send_json({"type": "transcript", "text": transcript, "final": False})
+        except Exception as e:
+            # A failed partial is not fatal, the final transcript is what counts
+            print(f"⚠️ Partial transcript failed: {str(e)}")
+    
+    async def finish_utterance(self):
+        pcm = bytes(self.utterance)
+        self.utterance = bytearray()
+        self.partial_mark = 0
+        if self.partial_task:
+            self.partial_task.cancel()
+        if not pcm:
+            return
+        if self.cancel_response():
+            await self.send_json({"type": "cancelled", "reason": "new_utterance"})
+        self.response_task = asyncio.ensure_future(self.respond(pcm))
+    
+    async def respond(self, pcm: bytes):
+        """Final transcript, then the answer spoken sentence by sentence"""
+        try:
+            transcript, _ = await run_stage("stt", transcribe_speech, pcm_to_wav(pcm, self.sample_rate), self.language)
+            await self.send_json({"type": "transcript", "text": transcript, "final": True})
+            if not transcript:
+                return
+            
+            question = self.prompt.replace("{transcript}", transcript)
+            sentences = []
+            async for index, sentence, audio_bytes in sentence_audio_stream(question, self.speed, self.language,
+                                                                            audio_format=self.audio_format):
+                sentences.append(sentence)
+                await self.send_audio({
+                    "type": "audio",
+                    "index": index,
+                    "text": sentence,
+                    "format": self.audio_format,
+                    "size": len(audio_bytes)
+                }, audio_bytes)
+            await self.send_json({"type": "done", "transcript": transcript, "ai_answer": " ".join(sentences)})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Voice session error: {str(e)}")
+            try:
+                await self.send_json({"type": "error", "detail": str(e)})
+            except Exception:
+                pass
+    
+    def cancel_response(self) -> bool:
+        """Cancel the in-flight answer; returns True if there was one"""
+        if self.response_task and not self.response_task.done():
+            self.response_task.cancel()
+            return True
+        return False
+    
+    def cancel_tasks(self):
+        self.cancel_response()
+        if self.partial_task:
+            self.partial_task.cancel()
+
+
+@app.websocket("/ws/voice")
+async def voice_session(websocket: WebSocket):
+    """Full-duplex voice conversation, see VoiceSession for the protocol"""
+    print("🔌 Voice session connected")
+    await VoiceSession(websocket).run()
+    print("🔌 Voice session closed")
+
 if __name__ == "__main__":
     import uvicorn
     print("🚀 Starting Text-to-Speech API server...")
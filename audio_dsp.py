@@ -0,0 +1,320 @@
+"""
+NumPy audio helpers shared by the API and the Streamlit app
+"""
+import wave
+from io import BytesIO
+
+import numpy as np
+from pydub import AudioSegment
+
+
+def pcm_to_float(raw: bytes, sample_width: int) -> np.ndarray:
+    """
+    Signed little-endian PCM (8/16/24/32-bit, as pydub holds it) to a flat float32 array in [-1, 1]
+    """
+    if sample_width == 3:
+        # No 24-bit dtype: put each sample in the top three bytes of an int32
+        padded = np.zeros((len(raw) // 3, 4), dtype=np.uint8)
+        padded[:, 1:] = np.frombuffer(raw, dtype=np.uint8, count=padded.shape[0] * 3).reshape(-1, 3)
+        return padded.view("<i4").ravel().astype(np.float32) / float(1 << 31)
+    samples = np.frombuffer(raw, dtype=f"<i{sample_width}").astype(np.float32)
+    return samples / float(1 << (8 * sample_width - 1))
+
+
+def float_to_pcm(samples: np.ndarray, sample_width: int) -> bytes:
+    """Inverse of pcm_to_float: float samples in [-1, 1] to signed little-endian PCM bytes"""
+    scale = float(1 << (8 * sample_width - 1))
+    if sample_width == 3:
+        pcm = np.clip(samples * scale, -scale, scale - 1).astype("<i4")
+        return pcm.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    return np.clip(samples * scale, -scale, scale - 1).astype(f"<i{sample_width}").tobytes()
+
+
+def segment_to_array(audio: AudioSegment) -> np.ndarray:
+    """
+    Convert a pydub AudioSegment to a float32 array of shape (frames, channels) in [-1, 1]
+    """
+    return pcm_to_float(audio.raw_data, audio.sample_width).reshape(-1, audio.channels)
+
+
+def array_to_segment(samples: np.ndarray, template: AudioSegment, frame_rate: int = None) -> AudioSegment:
+    """
+    Convert a float array of shape (frames, channels) back to an AudioSegment
+    with the sample width and channel count of `template`
+    """
+    overrides = {"frame_rate": frame_rate} if frame_rate else {}
+    return template._spawn(float_to_pcm(samples, template.sample_width), overrides=overrides)
+
+
+def time_stretch(samples: np.ndarray, sample_rate: int, speed: float,
+                 frame_ms: float = 30.0, tolerance_ms: float = 10.0) -> np.ndarray:
+    """
+    Pitch-preserving time stretch using WSOLA (waveform similarity overlap-add)
+
+    Output frames are laid down every half frame. Each one is read from the input
+    near its nominal position (advanced by `speed` times the output hop), shifted
+    within +/- tolerance to best continue the previous frame's waveform.
+    The similarity search runs on a decimated mono copy and is refined at full
+    resolution; the overlap-add itself is fully vectorized.
+
+    Args:
+        samples: Float array of shape (frames,) or (frames, channels)
+        sample_rate: Sample rate in Hz
+        speed: Speed multiplier (0.5 = half speed, 2.0 = double speed)
+        frame_ms: Analysis frame length in milliseconds
+        tolerance_ms: Maximum position shift searched per frame in milliseconds
+
+    Returns:
+        Float32 array of about len(samples) / speed frames with the same channel layout
+    """
+    mono_input = samples.ndim == 1
+    x = samples[:, None] if mono_input else samples
+    x = x.astype(np.float32, copy=False)
+    n_in = x.shape[0]
+    n_out = int(round(n_in / speed))
+
+    if speed == 1.0 or n_in == 0:
+        return samples.astype(np.float32, copy=True)
+
+    frame = max(64, int(sample_rate * frame_ms / 1000) // 2 * 2)
+    hop_out = frame // 2
+    hop_in = hop_out * speed
+    tol = int(sample_rate * tolerance_ms / 1000)
+    decim = max(1, sample_rate // 8000)
+
+    n_frames = max(1, int(np.ceil(n_out / hop_out)) + 1)
+
+    # Pad so every candidate window stays in bounds
+    pad_after = int(np.ceil((n_frames - 1) * hop_in)) + frame + hop_out + 2 * tol
+    xp = np.pad(x, ((tol, pad_after), (0, 0)))
+    mono = xp.mean(axis=1)
+    coarse = mono[::decim]
+
+    # Nominal read positions in padded coordinates
+    nominal = tol + np.round(np.arange(n_frames) * hop_in).astype(np.int64)
+    positions = np.empty(n_frames, dtype=np.int64)
+    positions[0] = nominal[0]
+
+    frame_c = frame // decim
+    span_c = (frame + 2 * tol) // decim
+    for k in range(1, n_frames):
+        # Natural continuation of the previously chosen frame
+        ref_start = positions[k - 1] + hop_out
+        search_start = nominal[k] - tol
+
+        # Coarse search on the decimated signal
+        ref = coarse[ref_start // decim:ref_start // decim + frame_c]
+        seg = coarse[search_start // decim:search_start // decim + span_c]
+        best = (search_start // decim + int(np.argmax(np.correlate(seg, ref, "valid")))) * decim
+
+        # Refine around the coarse match at full resolution
+        lo = max(best - decim, 0)
+        ref = mono[ref_start:ref_start + frame]
+        seg = mono[lo:best + decim + frame]
+        positions[k] = lo + int(np.argmax(np.correlate(seg, ref, "valid")))
+
+    # Gather all frames at once and window them (periodic Hann sums to 1 at 50% overlap)
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame)).astype(np.float32)
+    frames = xp[positions[:, None] + np.arange(frame)] * window[None, :, None]
+
+    # With a half-frame hop, even frames and odd frames each tile without overlap,
+    # so overlap-add is two reshapes and a sum
+    channels = x.shape[1]
+    out = np.zeros(((n_frames + 1) * hop_out, channels), dtype=np.float32)
+    even = frames[0::2].reshape(-1, channels)
+    odd = frames[1::2].reshape(-1, channels)
+    out[:even.shape[0]] += even
+    out[hop_out:hop_out + odd.shape[0]] += odd
+
+    out = out[:n_out]
+    return out[:, 0] if mono_input else out
+
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """
+    Band-limited resampling of a 1-D signal by zero-padding/truncating its spectrum
+    """
+    if source_rate == target_rate or samples.size == 0:
+        return samples.astype(np.float32, copy=False)
+    n_out = max(1, int(round(samples.shape[0] * target_rate / source_rate)))
+    spectrum = np.fft.rfft(samples)
+    # irfft pads with zeros when upsampling and drops the bins above the new Nyquist when downsampling
+    out = np.fft.irfft(spectrum, n_out) * (n_out / samples.shape[0])
+    return out.astype(np.float32)
+
+
+def speech_bounds(samples: np.ndarray, sample_rate: int, frame_ms: float = 20.0,
+                  margin_db: float = 12.0, range_db: float = 35.0, pad_ms: float = 200.0,
+                  silence_db: float = -55.0):
+    """
+    Energy voice activity detection: find where speech starts and ends
+
+    Frames louder than both the noise floor (10th percentile frame energy) plus
+    `margin_db` and the loudest frame minus `range_db` count as speech. A
+    recording whose loudest frame is below `silence_db` dBFS has no speech.
+
+    Args:
+        samples: Mono float signal
+        sample_rate: Sample rate in Hz
+        frame_ms: Analysis frame length
+        margin_db: Required level above the noise floor
+        range_db: Frames this far below the peak are never speech
+        pad_ms: Audio kept before the first and after the last speech frame
+        silence_db: Level below which the whole recording counts as silence
+
+    Returns:
+        (start, end) sample indexes, or None when no speech was detected
+    """
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = samples.shape[0] // frame
+    if n_frames == 0:
+        return None
+
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    energy_db = 10 * np.log10(np.mean(frames.astype(np.float64) ** 2, axis=1) + 1e-12)
+    peak_db = energy_db.max()
+    if peak_db < silence_db:
+        return None
+
+    threshold = max(np.percentile(energy_db, 10) + margin_db, peak_db - range_db)
+    # A recording with no quiet part at all has nothing to trim
+    threshold = min(threshold, peak_db - 3)
+
+    voiced = np.flatnonzero(energy_db > threshold)
+    if voiced.size == 0:
+        return None
+
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(samples.shape[0], (voiced[-1] + 1) * frame + pad)
+    return start, end
+
+
+def preprocess_speech(wav_bytes: bytes, target_rate: int = 16000):
+    """
+    Prepare a WAV recording for speech recognition: mono, `target_rate`, silence trimmed
+
+    Args:
+        wav_bytes: PCM WAV bytes (e.g. from audio_recorder)
+        target_rate: Output sample rate, 16 kHz is what recognizers work at
+
+    Returns:
+        Tuple of (16-bit mono WAV bytes, stats dict with durations and sizes)
+    """
+    with wave.open(BytesIO(wav_bytes), "rb") as source:
+        channels = source.getnchannels()
+        sample_width = source.getsampwidth()
+        source_rate = source.getframerate()
+        raw = source.readframes(source.getnframes())
+
+    if sample_width == 1:
+        # 8-bit WAV is unsigned
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    else:
+        samples = pcm_to_float(raw, sample_width)
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    original_seconds = samples.shape[0] / source_rate
+
+    samples = resample(samples, source_rate, target_rate)
+    bounds = speech_bounds(samples, target_rate)
+    if bounds is not None:
+        samples = samples[bounds[0]:bounds[1]]
+
+    output_buffer = BytesIO()
+    with wave.open(output_buffer, "wb") as target:
+        target.setnchannels(1)
+        target.setsampwidth(2)
+        target.setframerate(target_rate)
+        target.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    processed = output_buffer.getvalue()
+
+    processed_seconds = samples.shape[0] / target_rate
+    return processed, {
+        "speech_detected": bounds is not None,
+        "original_seconds": round(original_seconds, 2),
+        "processed_seconds": round(processed_seconds, 2),
+        "trimmed_seconds": round(original_seconds - processed_seconds, 2),
+        "original_kb": round(len(wav_bytes) / 1024, 2),
+        "processed_kb": round(len(processed) / 1024, 2),
+        "saved_kb": round((len(wav_bytes) - len(processed)) / 1024, 2)
+    }
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int, channels: int = 1) -> bytes:
+    """Wrap raw 16-bit little-endian PCM in a WAV container"""
+    output_buffer = BytesIO()
+    with wave.open(output_buffer, "wb") as target:
+        target.setnchannels(channels)
+        target.setsampwidth(2)
+        target.setframerate(sample_rate)
+        target.writeframes(pcm)
+    return output_buffer.getvalue()
+
+
+def segment_to_l16(audio: AudioSegment, sample_rate: int) -> bytes:
+    """
+    Raw mono 16-bit big-endian PCM (audio/L16, RFC 2586) at `sample_rate`
+    """
+    samples = resample(segment_to_array(audio).mean(axis=1), audio.frame_rate, sample_rate)
+    return np.clip(samples * 32768, -32768, 32767).astype(">i2").tobytes()
+
+
+class StreamingVAD:
+    """
+    Frame-energy voice activity detector for live 16-bit mono PCM
+
+    feed() returns "start" when speech begins and "end" once it has been
+    followed by `end_silence_ms` of quiet, so a caller can cut utterances
+    from a microphone stream and detect barge-in.
+    """
+
+    def __init__(self, sample_rate: int, speech_db: float = -40.0,
+                 frame_ms: float = 20.0, start_ms: float = 60.0, end_silence_ms: float = 700.0):
+        self.frame = max(1, int(sample_rate * frame_ms / 1000))
+        self.speech_db = speech_db
+        self.start_frames = max(1, int(start_ms / frame_ms))
+        self.end_frames = max(1, int(end_silence_ms / frame_ms))
+        self.in_speech = False
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._remainder = np.zeros(0, dtype=np.float32)
+
+    def reset(self):
+        """Forget the current utterance, e.g. after the client ended it explicitly"""
+        self.in_speech = False
+        self._voiced_run = 0
+        self._silent_run = 0
+
+    def feed(self, pcm: bytes) -> list:
+        """
+        Process a chunk of PCM
+
+        Returns:
+            List of "start" / "end" events, in order
+        """
+        samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768
+        samples = np.concatenate([self._remainder, samples])
+        n_frames = samples.shape[0] // self.frame
+        self._remainder = samples[n_frames * self.frame:]
+        if n_frames == 0:
+            return []
+
+        frames = samples[:n_frames * self.frame].reshape(n_frames, self.frame)
+        voiced = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12) > self.speech_db
+
+        events = []
+        for is_voiced in voiced:
+            if is_voiced:
+                self._voiced_run += 1
+                self._silent_run = 0
+            else:
+                self._silent_run += 1
+                self._voiced_run = 0
+
+            if not self.in_speech and self._voiced_run >= self.start_frames:
+                self.in_speech = True
+                events.append("start")
+            elif self.in_speech and self._silent_run >= self.end_frames:
+                self.in_speech = False
+                events.append("end")
+        return events
@@ -0,0 +1,273 @@
+"""
+Load test: /ask at fixed concurrency levels against stub upstreams
+
+Starts benchmarks/stub_upstreams.py and the API (via serve_offline.py) as
+subprocesses, drives /ask with N concurrent clients per level and reports
+throughput, p50/p95/p99 latency and the mean time per pipeline stage (from
+the API's /metrics). Results are written as JSON for comparison across commits.
+
+With --cassette the upstreams are benchmarks/cassette_upstreams.py instead:
+`--cassette-mode record` runs against the real Groq and Google services (needs
+GROQ_API_KEY and network) and saves their responses, `replay` serves them back
+offline at the recorded or at zero latency.
+
+Usage:
+    python benchmarks/bench_ask.py [--levels 1 4 16] [--requests 100] [--speeds 1.0 1.5]
+    python benchmarks/bench_ask.py --cassette benchmarks/cassettes/ask.jsonl --cassette-mode record --question-pool 20
+    python benchmarks/bench_ask.py --cassette benchmarks/cassettes/ask.jsonl --replay-latency zero
+    python benchmarks/bench_ask.py --compare benchmarks/results/ask-<old>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+from stub_upstreams import add_stub_arguments
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+STAGE_SAMPLE = re.compile(r'^voice_stage_seconds_(sum|count)\{stage="([^"]+)".*\} (\S+)$')
+
+
+def start_process(args: list, log_path: str) -> subprocess.Popen:
+    env = dict(os.environ, NO_PROXY="127.0.0.1,localhost", no_proxy="127.0.0.1,localhost")
+    log = open(log_path, "w")
+    return subprocess.Popen([sys.executable] + args, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}, see the log in benchmarks/results/")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def stage_totals(api_url: str) -> dict:
+    """{stage: [seconds, count]} summed over all label combinations"""
+    totals = {}
+    for line in httpx.get(f"{api_url}/metrics", timeout=5.0).text.splitlines():
+        match = STAGE_SAMPLE.match(line)
+        if match:
+            kind, stage, value = match.groups()
+            entry = totals.setdefault(stage, [0.0, 0])
+            if kind == "sum":
+                entry[0] += float(value)
+            else:
+                entry[1] += int(float(value))
+    return totals
+
+
+def percentiles(latencies: list) -> dict:
+    if not latencies:
+        return {}
+    values = np.array(latencies) * 1000
+    return {
+        "p50": round(float(np.percentile(values, 50)), 1),
+        "p95": round(float(np.percentile(values, 95)), 1),
+        "p99": round(float(np.percentile(values, 99)), 1),
+        "mean": round(float(values.mean()), 1),
+        "max": round(float(values.max()), 1)
+    }
+
+
+async def run_level(api_url: str, concurrency: int, total: int, args) -> dict:
+    """Send `total` requests from `concurrency` workers and collect latencies"""
+    rng = random.Random(concurrency)
+    pool = [f"Benchmark question {i}: how do I keep latency low?" for i in range(args.question_pool)]
+    remaining = iter(range(total))
+    latencies = []
+    statuses = {}
+    response_bytes = 0
+
+    async def worker(client):
+        nonlocal response_bytes
+        for _ in remaining:
+            question = rng.choice(pool) if pool else f"Benchmark question {uuid.uuid4().hex}: how do I keep latency low?"
+            start = time.perf_counter()
+            try:
+                response = await client.post("/ask", data={
+                    "question": question,
+                    "speed": rng.choice(args.speeds),
+                    "language": "en",
+                    "response_format": args.response_format,
+                    "audio_format": args.audio_format
+                })
+                status = str(response.status_code)
+                response_bytes += len(response.content)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "200":
+                latencies.append(elapsed)
+
+    before = stage_totals(api_url)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=api_url, timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(client) for _ in range(concurrency)])
+        wall = time.perf_counter() - start
+    after = stage_totals(api_url)
+
+    stages = {}
+    for stage, (seconds, count) in after.items():
+        seconds -= before.get(stage, [0.0, 0])[0]
+        count -= before.get(stage, [0.0, 0])[1]
+        if count:
+            stages[stage] = {"calls": count, "mean_ms": round(seconds / count * 1000, 2), "total_s": round(seconds, 3)}
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": len(latencies),
+        "statuses": statuses,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2),
+        "latency_ms": percentiles(latencies),
+        "mean_response_kb": round(response_bytes / total / 1024, 2),
+        "stages": stages
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_level(level: dict):
+    latency = level["latency_ms"]
+    print(f"\n▶ concurrency {level['concurrency']}: {level['throughput_rps']} req/s, "
+          f"p50 {latency.get('p50')} ms, p95 {latency.get('p95')} ms, p99 {latency.get('p99')} ms, "
+          f"statuses {level['statuses']}")
+    for stage, numbers in sorted(level["stages"].items(), key=lambda item: -item[1]["total_s"]):
+        print(f"    {stage:<18} {numbers['calls']:>6} calls  {numbers['mean_ms']:>9.2f} ms mean")
+
+
+def compare(results: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    print(f"\nCompared with {baseline['commit']} ({baseline_path}):")
+    for level in results["levels"]:
+        old = old_levels.get(level["concurrency"])
+        if old is None or not old["latency_ms"] or not level["latency_ms"]:
+            continue
+        deltas = [
+            f"{key} {level['latency_ms'][key] - old['latency_ms'][key]:+.1f} ms"
+            for key in ("p50", "p95", "p99")
+        ]
+        print(f"  concurrency {level['concurrency']}: "
+              f"{level['throughput_rps'] - old['throughput_rps']:+.2f} req/s, {', '.join(deltas)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16], help="Concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per level")
+    parser.add_argument("--speeds", type=float, nargs="+", default=[1.0], help="Speeds picked at random per request")
+    parser.add_argument("--response-format", choices=["json", "audio"], default="json")
+    parser.add_argument("--audio-format", choices=["mp3", "mp3_low", "ogg_opus", "webm_opus", "pcm"], default="mp3")
+    parser.add_argument("--question-pool", type=int, default=0,
+                        help="Draw questions from a pool of this size (answer cache hits); 0 = all unique")
+    parser.add_argument("--warmup", type=int, default=5, help="Requests sent before measuring")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--api-port", type=int, default=8100)
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--output", help="Results file (default benchmarks/results/ask-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to print deltas against")
+    parser.add_argument("--cassette", help="Use recorded upstreams from this cassette instead of the stubs")
+    parser.add_argument("--cassette-mode", choices=["record", "replay"], default="replay")
+    parser.add_argument("--replay-latency", choices=["recorded", "zero"], default="recorded")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    results_dir = os.path.join(HERE, "results")
+    os.makedirs(results_dir, exist_ok=True)
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    api_url = f"http://127.0.0.1:{args.api_port}"
+
+    if args.cassette:
+        stub_args = [
+            os.path.join(HERE, "cassette_upstreams.py"), "--port", str(args.stub_port),
+            "--cassette", args.cassette, "--mode", args.cassette_mode, "--latency", args.replay_latency
+        ]
+    else:
+        stub_args = [
+            os.path.join(HERE, "stub_upstreams.py"), "--port", str(args.stub_port),
+            "--llm-latency-ms", str(args.llm_latency_ms), "--llm-sigma", str(args.llm_sigma),
+            "--llm-words", str(args.llm_words[0]), str(args.llm_words[1]),
+            "--tts-latency-ms", str(args.tts_latency_ms), "--tts-sigma", str(args.tts_sigma),
+            "--tts-kbps", str(args.tts_kbps), "--error-rate", str(args.error_rate)
+        ]
+        if args.seed is not None:
+            stub_args += ["--seed", str(args.seed)]
+
+    processes = []
+    try:
+        print(f"🚀 Starting {'cassette' if args.cassette else 'stub'} upstreams and the API...")
+        processes.append(start_process(stub_args, os.path.join(results_dir, "stub.log")))
+        wait_until_up(f"{stub_url}/stats", processes[-1])
+        processes.append(start_process(
+            [os.path.join(HERE, "serve_offline.py"), "--upstream", stub_url, "--port", str(args.api_port)],
+            os.path.join(results_dir, "api.log")
+        ))
+        wait_until_up(f"{api_url}/health", processes[-1])
+
+        if args.warmup:
+            asyncio.run(run_level(api_url, 1, args.warmup, args))
+
+        levels = []
+        for concurrency in args.levels:
+            level = asyncio.run(run_level(api_url, concurrency, args.requests, args))
+            print_level(level)
+            levels.append(level)
+        upstream_calls = httpx.get(f"{stub_url}/stats").json()
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    results = {
+        "benchmark": "ask",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "compare", "api_port", "stub_port")
+        },
+        "upstream_calls": upstream_calls,
+        "levels": levels
+    }
+    output = args.output or os.path.join(
+        results_dir, f"ask-{results['commit']}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Micro-benchmark of the audio path: MP3 decode, time stretch, MP3 encode, base64
+
+Runs each stage of adjust_audio_speed (and the whole function) on synthetic
+speech MP3s of several lengths at every speed from 0.5x to 2.0x in 0.1 steps,
+and records wall time, CPU time, peak memory and output size per stage.
+
+CPU time is split into this process (NumPy, pydub, base64) and child processes
+(ffmpeg doing the MP3 decode/encode). Peak memory is what tracemalloc sees,
+which includes NumPy buffers but not ffmpeg.
+
+Usage:
+    python benchmarks/bench_audio_pipeline.py [--durations 5 30 180] [--speeds 0.5 1.5] [--repeat 3]
+"""
+import argparse
+import base64
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from io import BytesIO
+
+from pydub import AudioSegment
+
+from bench_ask import git_commit
+from bench_time_stretch import synthetic_speech
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+from app import adjust_audio_speed, encode_audio, mp3_bitrate_kbps  # noqa: E402
+from audio_dsp import array_to_segment, segment_to_array, time_stretch  # noqa: E402
+
+DURATIONS = [5, 15, 30, 60, 120, 180]
+SPEEDS = [round(0.5 + 0.1 * i, 1) for i in range(16)]
+
+
+def child_cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def measure(func, repeat: int):
+    """Run func `repeat` times and keep the fastest run's result and numbers"""
+    best = None
+    for _ in range(repeat):
+        tracemalloc.reset_peak()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        child_start = child_cpu_seconds()
+        result = func()
+        numbers = {
+            "wall_ms": round((time.perf_counter() - wall_start) * 1000, 2),
+            "cpu_ms": round((time.process_time() - cpu_start) * 1000, 2),
+            "child_cpu_ms": round((child_cpu_seconds() - child_start) * 1000, 2),
+            "peak_kb": round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        }
+        if best is None or numbers["wall_ms"] < best[1]["wall_ms"]:
+            best = (result, numbers)
+    return best
+
+
+def synthetic_mp3(seconds: float) -> bytes:
+    """gTTS-like MP3: 24 kHz mono at 32 kbps"""
+    output_buffer = BytesIO()
+    synthetic_speech(seconds).export(output_buffer, format="mp3", bitrate="32k")
+    return output_buffer.getvalue()
+
+
+def bench_case(mp3: bytes, speed: float, repeat: int) -> dict:
+    """All stages for one input and speed"""
+    stages = {}
+    audio, stages["decode"] = measure(lambda: AudioSegment.from_file(BytesIO(mp3), format="mp3"), repeat)
+    samples, stages["to_array"] = measure(lambda: segment_to_array(audio), repeat)
+    stretched, stages["time_stretch"] = measure(lambda: time_stretch(samples, audio.frame_rate, speed), repeat)
+    segment, stages["to_segment"] = measure(lambda: array_to_segment(stretched, audio), repeat)
+    # Encoded the way adjust_audio_speed does it, at the source bitrate
+    source_kbps = mp3_bitrate_kbps(len(mp3), audio.duration_seconds)
+    output, stages["encode"] = measure(lambda: encode_audio(segment, "mp3", source_kbps), repeat)
+    encoded, stages["base64"] = measure(lambda: base64.b64encode(output), repeat)
+    end_to_end, stages["adjust_audio_speed"] = measure(lambda: adjust_audio_speed(mp3, speed), repeat)
+
+    stages["encode"]["output_kb"] = round(len(output) / 1024, 2)
+    stages["base64"]["output_kb"] = round(len(encoded) / 1024, 2)
+    stages["adjust_audio_speed"]["output_kb"] = round(len(end_to_end) / 1024, 2)
+    return {
+        "speed": speed,
+        "input_kb": round(len(mp3) / 1024, 2),
+        "output_seconds": round(len(segment) / 1000, 2),
+        "stages": stages
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", type=float, nargs="+", default=DURATIONS, help="Input lengths in seconds")
+    parser.add_argument("--speeds", type=float, nargs="+", default=SPEEDS)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage, the fastest is kept")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/audio-<commit>-<time>.json)")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    cases = []
+    for seconds in args.durations:
+        mp3 = synthetic_mp3(seconds)
+        print(f"\n🎵 {seconds:g}s input ({len(mp3) / 1024:.1f} KB)")
+        print(f"{'speed':>6} {'decode':>9} {'stretch':>9} {'encode':>9} {'base64':>9} {'total':>9} {'out KB':>8} {'peak MB':>8}")
+        for speed in args.speeds:
+            case = bench_case(mp3, speed, args.repeat)
+            case["input_seconds"] = seconds
+            cases.append(case)
+            stages = case["stages"]
+            print(f"{speed:>5.1f}x "
+                  f"{stages['decode']['wall_ms']:>7.1f}ms {stages['time_stretch']['wall_ms']:>7.1f}ms "
+                  f"{stages['encode']['wall_ms']:>7.1f}ms {stages['base64']['wall_ms']:>7.1f}ms "
+                  f"{stages['adjust_audio_speed']['wall_ms']:>7.1f}ms "
+                  f"{stages['encode']['output_kb']:>8.1f} "
+                  f"{max(s['peak_kb'] for s in stages.values()) / 1024:>8.1f}")
+    tracemalloc.stop()
+
+    results = {
+        "benchmark": "audio_pipeline",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"durations": args.durations, "speeds": args.speeds, "repeat": args.repeat},
+        "cases": cases
+    }
+    output = args.output
+    if not output:
+        os.makedirs(os.path.join(HERE, "results"), exist_ok=True)
+        output = os.path.join(
+            HERE, "results", f"audio-{results['commit']}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        )
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: NumPy WSOLA time stretch vs the old pydub speed path
+
+Compares the PCM stage of adjust_audio_speed (MP3 decode/encode is identical
+for both and excluded) on synthetic speech-like audio.
+
+Usage:
+    python benchmarks/bench_time_stretch.py [--durations 30 60 120] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from pydub import AudioSegment
+from pydub.effects import speedup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_dsp import array_to_segment, segment_to_array, time_stretch  # noqa: E402
+
+SAMPLE_RATE = 24000  # gTTS MP3s decode to 24 kHz mono
+SPEEDS = [0.5, 0.75, 1.25, 1.5, 1.75, 2.0]
+
+
+def synthetic_speech(seconds: float, sample_rate: int = SAMPLE_RATE, seed: int = 0) -> AudioSegment:
+    """Voiced harmonic 'syllables' with a wandering pitch, separated by short pauses"""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    t = np.arange(n) / sample_rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t) + 10 * rng.standard_normal(n).cumsum() / np.sqrt(n)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voiced = sum(np.sin(h * phase) / h for h in range(1, 8))
+    envelope = (np.sin(2 * np.pi * 4 * t) > -0.3).astype(np.float32)
+    signal = 0.3 * voiced * envelope + 0.01 * rng.standard_normal(n)
+    pcm = (np.clip(signal, -1, 1) * 32767).astype("<i2")
+    return AudioSegment(pcm.tobytes(), frame_rate=sample_rate, sample_width=2, channels=1)
+
+
+def legacy_speed(audio: AudioSegment, speed: float) -> AudioSegment:
+    """The previous adjust_audio_speed PCM stage"""
+    if speed > 1.0:
+        return speedup(audio, playback_speed=speed)
+    audio = audio._spawn(audio.raw_data, overrides={"frame_rate": int(audio.frame_rate * speed)})
+    return audio.set_frame_rate(audio.frame_rate)
+
+
+def wsola_speed(audio: AudioSegment, speed: float) -> AudioSegment:
+    return array_to_segment(time_stretch(segment_to_array(audio), audio.frame_rate, speed), audio)
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", type=float, nargs="+", default=[30, 60, 120])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'duration':>9} {'speed':>6} {'legacy_ms':>10} {'wsola_ms':>9} {'speedup':>8} {'out_s':>7}")
+    for seconds in args.durations:
+        audio = synthetic_speech(seconds)
+        for speed in SPEEDS:
+            legacy = best_of(lambda: legacy_speed(audio, speed), args.repeat)
+            wsola = best_of(lambda: wsola_speed(audio, speed), args.repeat)
+            out_seconds = len(wsola_speed(audio, speed)) / 1000
+            print(f"{seconds:>8.0f}s {speed:>6.2f} {legacy * 1000:>10.1f} {wsola * 1000:>9.1f} "
+                  f"{legacy / wsola:>7.1f}x {out_seconds:>7.1f}")
+
+    print("\nNote: below 1.0x the legacy path only relabels the frame rate (no DSP, pitch drops),")
+    print("so its timing there is a lower bound rather than a like-for-like comparison.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Record real Groq, gTTS and Google STT traffic to a cassette and replay it offline
+
+In record mode this is a pass-through proxy: every request is forwarded to the
+real upstream and the response (status, content type and body chunks with
+their arrival times) is appended to a JSON-lines cassette. In replay mode the
+same responses are served from the cassette without touching the network,
+either at the recorded latency (`--latency recorded`, chunk by chunk, so
+streamed completions keep their pacing) or immediately (`--latency zero`),
+which leaves only our own code's overhead in the numbers.
+
+Requests are matched on method, path, query and a hash of the body. A request
+that was not recorded gets the next recording for the same endpoint in turn,
+unless `--strict` is given, so load tests with unique questions still replay.
+Request headers (API keys) are never written to the cassette.
+
+Point the API at it with benchmarks/serve_offline.py, or use
+`bench_ask.py --cassette`.
+
+Usage:
+    python benchmarks/cassette_upstreams.py --mode record --cassette benchmarks/cassettes/ask.jsonl
+    python benchmarks/cassette_upstreams.py --mode replay --cassette benchmarks/cassettes/ask.jsonl [--latency zero]
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+# Path prefix -> (cassette name, real base URL)
+UPSTREAMS = {
+    "/openai/": ("groq", "https://api.groq.com"),
+    "/_/TranslateWebserverUi/": ("gtts", "https://translate.google.com"),
+    "/speech-api/": ("google_stt", "http://www.google.com")
+}
+
+# Hop-by-hop and per-connection headers the proxy sets itself
+SKIP_REQUEST_HEADERS = {"host", "content-length", "connection", "accept-encoding", "transfer-encoding"}
+
+
+def find_upstream(path: str):
+    for prefix, upstream in UPSTREAMS.items():
+        if path.startswith(prefix):
+            return upstream
+    return None, None
+
+
+def request_key(method: str, path: str, query: str, body: bytes) -> str:
+    digest = hashlib.sha256(f"{method} {path}?{query}\n".encode("utf-8"))
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class Cassette:
+    """Recorded exchanges in a JSON-lines file, one object per request"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.exchanges = []
+        self._exact = {}
+        self._by_endpoint = {}
+        self._turns = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+
+    def _index(self, exchange: dict):
+        self.exchanges.append(exchange)
+        self._exact.setdefault(exchange["key"], []).append(exchange)
+        endpoint = (exchange["upstream"], exchange["method"], exchange["path"])
+        self._by_endpoint.setdefault(endpoint, []).append(exchange)
+
+    def add(self, exchange: dict):
+        """Append one exchange to the file straight away, so a killed recording keeps what it had"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(exchange) + "\n")
+        self._index(exchange)
+
+    def _next(self, candidates_key, candidates: list) -> dict:
+        # Cycle through repeated recordings of the same request in the order they were made
+        turn = self._turns.get(candidates_key, 0)
+        self._turns[candidates_key] = turn + 1
+        return candidates[turn % len(candidates)]
+
+    def match(self, upstream: str, method: str, path: str, key: str, strict: bool = False):
+        """
+        Find the recording to replay for a request
+
+        Returns:
+            Tuple of (exchange or None, True if it was an exact match)
+        """
+        if key in self._exact:
+            return self._next(key, self._exact[key]), True
+        endpoint = (upstream, method, path)
+        if strict or endpoint not in self._by_endpoint:
+            return None, False
+        return self._next(endpoint, self._by_endpoint[endpoint]), False
+
+    def summary(self) -> dict:
+        counts = {}
+        for exchange in self.exchanges:
+            counts[exchange["upstream"]] = counts.get(exchange["upstream"], 0) + 1
+        return counts
+
+
+def create_cassette_app(cassette: Cassette, mode: str, latency: str = "recorded", strict: bool = False,
+                        timeout: float = 60.0) -> FastAPI:
+    proxy = FastAPI(title=f"Cassette upstreams ({mode})")
+    proxy.state.requests = {
+        name: {"recorded": 0, "replayed": 0, "inexact": 0, "missed": 0}
+        for name, _ in UPSTREAMS.values()
+    }
+    client = httpx.AsyncClient(timeout=timeout) if mode == "record" else None
+
+    @proxy.get("/stats")
+    async def stats():
+        return proxy.state.requests
+
+    async def record(request: Request, upstream: str, base_url: str, path: str, key: str, body: bytes):
+        headers = {
+            name: value for name, value in request.headers.items()
+            if name.lower() not in SKIP_REQUEST_HEADERS
+        }
+        url = f"{base_url}{path}"
+        if request.url.query:
+            url += f"?{request.url.query}"
+
+        start = time.perf_counter()
+        upstream_request = client.build_request(request.method, url, headers=headers, content=body)
+        upstream_response = await client.send(upstream_request, stream=True)
+        headers_ms = (time.perf_counter() - start) * 1000
+        content_type = upstream_response.headers.get("content-type", "application/octet-stream")
+
+        async def relay():
+            chunks = []
+            try:
+                async for chunk in upstream_response.aiter_bytes():
+                    chunks.append([round((time.perf_counter() - start) * 1000, 3),
+                                   base64.b64encode(chunk).decode("ascii")])
+                    yield chunk
+            finally:
+                await upstream_response.aclose()
+            cassette.add({
+                "upstream": upstream,
+                "method": request.method,
+                "path": path,
+                "query": request.url.query,
+                "key": key,
+                "request_bytes": len(body),
+                "status": upstream_response.status_code,
+                "content_type": content_type,
+                "headers_ms": round(headers_ms, 3),
+                "chunks": chunks,
+                "recorded_at": time.time()
+            })
+            proxy.state.requests[upstream]["recorded"] += 1
+            print(f"📼 Recorded {upstream} {request.method} {path} → {upstream_response.status_code} "
+                  f"in {chunks[-1][0] if chunks else headers_ms:.0f} ms")
+
+        return StreamingResponse(relay(), status_code=upstream_response.status_code, media_type=content_type)
+
+    async def replay(upstream: str, request: Request, path: str, key: str):
+        exchange, exact = cassette.match(upstream, request.method, path, key, strict)
+        counts = proxy.state.requests[upstream]
+        if exchange is None:
+            counts["missed"] += 1
+            return JSONResponse(
+                {"error": {"message": f"No recording for {request.method} {path}", "type": "cassette_miss"}},
+                status_code=502
+            )
+        counts["replayed"] += 1
+        if not exact:
+            counts["inexact"] += 1
+
+        chunks = [(offset_ms / 1000, base64.b64decode(data)) for offset_ms, data in exchange["chunks"]]
+        if latency == "zero":
+            return Response(b"".join(data for _, data in chunks), status_code=exchange["status"],
+                            media_type=exchange["content_type"])
+
+        start = time.perf_counter()
+        await asyncio.sleep(exchange["headers_ms"] / 1000)
+
+        async def paced():
+            for offset, data in chunks:
+                delay = offset - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield data
+
+        return StreamingResponse(paced(), status_code=exchange["status"], media_type=exchange["content_type"])
+
+    @proxy.api_route("/{path:path}", methods=["GET", "POST"])
+    async def forward(path: str, request: Request):
+        path = f"/{path}"
+        upstream, base_url = find_upstream(path)
+        if upstream is None:
+            return JSONResponse({"error": {"message": f"Unknown upstream path {path}"}}, status_code=404)
+        body = await request.body()
+        key = request_key(request.method, path, request.url.query, body)
+        if mode == "record":
+            return await record(request, upstream, base_url, path, key, body)
+        return await replay(upstream, request, path, key)
+
+    @proxy.on_event("shutdown")
+    async def close_client():
+        if client is not None:
+            await client.aclose()
+
+    return proxy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["record", "replay"], required=True)
+    parser.add_argument("--cassette", required=True, help="JSON-lines cassette file (appended to when recording)")
+    parser.add_argument("--latency", choices=["recorded", "zero"], default="recorded",
+                        help="Replay at the recorded timings or with no delay")
+    parser.add_argument("--strict", action="store_true",
+                        help="Only replay exact request matches, answer everything else with 502")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    cassette = Cassette(args.cassette)
+    if args.mode == "replay" and not cassette.exchanges:
+        parser.error(f"{args.cassette} has no recordings to replay")
+    print(f"📼 {args.mode.capitalize()} mode, {args.cassette}: {cassette.summary() or 'empty'}")
+    uvicorn.run(create_cassette_app(cassette, args.mode, args.latency, args.strict),
+                host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Run the API against local upstreams instead of Groq and Google
+
+Groq is redirected with GROQ_BASE_URL, gTTS by patching the translate URL it
+builds and Google STT by changing the recognizer's default endpoint, so
+benchmarks exercise the real request path (SDK, HTTP, decoding) against
+benchmarks/stub_upstreams.py, benchmarks/cassette_upstreams.py or any other
+stand-in.
+
+Usage:
+    python benchmarks/serve_offline.py --upstream http://127.0.0.1:9100 [--port 8100]
+"""
+import argparse
+import os
+import sys
+
+import uvicorn
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def redirect_upstreams(upstream: str):
+    """Send Groq, gTTS and Google STT traffic to `upstream` (call before importing app)"""
+    import gtts.tts
+    import speech_recognition.recognizers.google as google_stt
+
+    os.environ["GROQ_BASE_URL"] = upstream
+    os.environ.setdefault("GROQ_API_KEY", "offline")
+    # Local upstreams must not go through a proxy
+    os.environ["NO_PROXY"] = os.environ["no_proxy"] = "127.0.0.1,localhost"
+    gtts.tts._translate_url = lambda tld="com", path="": f"{upstream.rstrip('/')}/{path}"
+    # Recognizer.recognize_google is this function, so its keyword default is the endpoint used
+    google_stt.recognize_legacy.__kwdefaults__["endpoint"] = f"{upstream.rstrip('/')}/speech-api/v2/recognize"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--upstream", required=True, help="Base URL serving the Groq, gTTS and STT endpoints")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    redirect_upstreams(args.upstream)
+    sys.path.insert(0, ROOT)
+    from app import app
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
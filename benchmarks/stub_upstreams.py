@@ -0,0 +1,213 @@
+"""
+Local stand-ins for the Groq chat completions API, the gTTS translate endpoint
+and the Google speech recognition endpoint
+
+Answers and audio are synthetic, with configurable latency (log-normal around
+a median) and size, so /ask can be load-tested without network access or API
+quota. Point the API at it with benchmarks/serve_offline.py.
+
+Usage:
+    python benchmarks/stub_upstreams.py [--port 9100] [--llm-latency-ms 400] [--tts-latency-ms 250]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import random
+import time
+import uuid
+from io import BytesIO
+from urllib.parse import parse_qs
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydub import AudioSegment
+
+WORDS = (
+    "the answer depends on how you measure latency and throughput under load while keeping "
+    "answers short clear and useful for people listening on slow mobile networks with audio"
+).split()
+
+
+class StubConfig:
+    """Latency and payload distributions of the stub upstreams"""
+
+    def __init__(self, llm_latency_ms=400.0, llm_sigma=0.4, llm_words=(20, 80),
+                 tts_latency_ms=250.0, tts_sigma=0.4, chars_per_second=15.0, tts_kbps=32,
+                 error_rate=0.0, seed=None):
+        self.llm_latency_ms = llm_latency_ms
+        self.llm_sigma = llm_sigma
+        self.llm_words = llm_words
+        self.tts_latency_ms = tts_latency_ms
+        self.tts_sigma = tts_sigma
+        self.chars_per_second = chars_per_second
+        self.tts_kbps = tts_kbps
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+
+    def latency(self, median_ms: float, sigma: float) -> float:
+        """Seconds drawn from a log-normal distribution with the given median"""
+        return median_ms / 1000 * math.exp(sigma * self.rng.gauss(0, 1))
+
+    def answer(self) -> str:
+        n_words = self.rng.randint(*self.llm_words)
+        words = [self.rng.choice(WORDS) for _ in range(n_words)]
+        sentences = []
+        while words:
+            length = self.rng.randint(6, 14)
+            sentence, words = words[:length], words[length:]
+            sentences.append(" ".join(sentence).capitalize() + ".")
+        return " ".join(sentences)
+
+    def fail(self) -> bool:
+        return self.error_rate > 0 and self.rng.random() < self.error_rate
+
+
+_mp3_cache = {}
+
+
+def synthetic_mp3(seconds: float, kbps: int) -> bytes:
+    """Speech-like MP3 of about `seconds` at 24 kHz mono, like gTTS output (cached per 0.5 s)"""
+    seconds = max(0.5, round(seconds * 2) / 2)
+    key = (seconds, kbps)
+    if key not in _mp3_cache:
+        sample_rate = 24000
+        t = np.arange(int(seconds * sample_rate)) / sample_rate
+        phase = 2 * np.pi * np.cumsum(140 + 30 * np.sin(2 * np.pi * 0.7 * t)) / sample_rate
+        voiced = sum(np.sin(h * phase) / h for h in range(1, 6)) * (np.sin(2 * np.pi * 4 * t) > -0.3)
+        pcm = (np.clip(0.3 * voiced, -1, 1) * 32767).astype("<i2")
+        output_buffer = BytesIO()
+        AudioSegment(pcm.tobytes(), frame_rate=sample_rate, sample_width=2, channels=1).export(
+            output_buffer, format="mp3", bitrate=f"{kbps}k"
+        )
+        _mp3_cache[key] = output_buffer.getvalue()
+    return _mp3_cache[key]
+
+
+def create_stub_app(config: StubConfig) -> FastAPI:
+    stub = FastAPI(title="Stub Groq + gTTS upstreams")
+    stub.state.requests = {"llm": 0, "tts": 0, "stt": 0}
+
+    @stub.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stub.state.requests["llm"] += 1
+        latency = config.latency(config.llm_latency_ms, config.llm_sigma)
+        if config.fail():
+            await asyncio.sleep(latency / 4)
+            return JSONResponse({"error": {"message": "stub failure", "type": "server_error"}}, status_code=500)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        answer = config.answer()
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": body.get("model"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 20, "completion_tokens": len(answer) // 4, "total_tokens": 20 + len(answer) // 4}
+            }
+
+        async def events():
+            # Roughly a third of the latency before the first token, the rest spread over the answer
+            await asyncio.sleep(latency * 0.3)
+            pieces = [word + " " for word in answer.split(" ")]
+            for piece in pieces:
+                await asyncio.sleep(latency * 0.7 / len(pieces))
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @stub.post("/_/TranslateWebserverUi/data/batchexecute")
+    async def batchexecute(request: Request):
+        form = parse_qs((await request.body()).decode("utf-8"))
+        rpc = json.loads(form["f.req"][0])
+        text = json.loads(rpc[0][0][1])[0]
+        stub.state.requests["tts"] += 1
+
+        await asyncio.sleep(config.latency(config.tts_latency_ms, config.tts_sigma))
+        if config.fail():
+            return Response("stub failure", status_code=500)
+
+        mp3 = synthetic_mp3(len(text) / config.chars_per_second, config.tts_kbps)
+        encoded = base64.b64encode(mp3).decode("ascii")
+        # Same framing as Google's batchexecute response, which gTTS scans line by line
+        line = json.dumps([["wrb.fr", "jQ1olc", json.dumps([encoded]), None, None, None, "generic"]], separators=(",", ":"))
+        return Response(f")]}}'\n\n{len(line)}\n{line}\n", media_type="application/json")
+
+    @stub.post("/speech-api/v2/recognize")
+    async def recognize(request: Request):
+        await request.body()
+        stub.state.requests["stt"] += 1
+        await asyncio.sleep(config.latency(config.tts_latency_ms, config.tts_sigma))
+        if config.fail():
+            return Response("stub failure", status_code=500)
+        # Google sends an empty result line before the real one
+        result = {
+            "result": [{"alternative": [{"transcript": config.answer(), "confidence": 0.9}], "final": True}],
+            "result_index": 0
+        }
+        return Response(f'{{"result":[]}}\n{json.dumps(result)}\n', media_type="application/json")
+
+    @stub.get("/stats")
+    async def stats():
+        return stub.state.requests
+
+    return stub
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--llm-latency-ms", type=float, default=400.0, help="Median Groq latency")
+    parser.add_argument("--llm-sigma", type=float, default=0.4, help="Log-normal spread of Groq latency")
+    parser.add_argument("--llm-words", type=int, nargs=2, default=(20, 80), metavar=("MIN", "MAX"),
+                        help="Answer length range in words")
+    parser.add_argument("--tts-latency-ms", type=float, default=250.0, help="Median latency per gTTS request")
+    parser.add_argument("--tts-sigma", type=float, default=0.4, help="Log-normal spread of gTTS latency")
+    parser.add_argument("--tts-kbps", type=int, default=32, help="Bitrate of the synthetic MP3s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream calls that fail")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args) -> StubConfig:
+    return StubConfig(
+        llm_latency_ms=args.llm_latency_ms,
+        llm_sigma=args.llm_sigma,
+        llm_words=tuple(args.llm_words),
+        tts_latency_ms=args.tts_latency_ms,
+        tts_sigma=args.tts_sigma,
+        tts_kbps=args.tts_kbps,
+        error_rate=args.error_rate,
+        seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_stub_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Memory-bounded conversation history for Streamlit sessions
+
+Only the newest turns keep their audio in memory; older audio is spilled to a
+per-session directory on disk and read back when that turn is played again.
+"""
+import os
+import shutil
+import tempfile
+import time
+import weakref
+
+
+class HistoryEntry:
+    """One conversation turn; audio lives either in memory or in a spill file"""
+
+    __slots__ = ("user", "ai", "created_at", "audio_mime", "_audio", "_audio_path")
+
+    def __init__(self, user: str, ai: str, audio: bytes, audio_mime: str = "audio/mpeg"):
+        self.user = user
+        self.ai = ai
+        self.created_at = time.time()
+        self.audio_mime = audio_mime
+        self._audio = audio
+        self._audio_path = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._audio is None
+
+    @property
+    def audio(self) -> bytes:
+        """Audio bytes, read from the spill file if they were moved out of memory"""
+        if self._audio is not None:
+            return self._audio
+        if self._audio_path is None:
+            return b""
+        try:
+            with open(self._audio_path, "rb") as f:
+                return f.read()
+        except OSError:
+            return b""
+
+    def spill(self, path: str):
+        """Write the audio to `path` and drop the in-memory copy"""
+        with open(path, "wb") as f:
+            f.write(self._audio)
+        self._audio_path = path
+        self._audio = None
+
+
+class ConversationHistory:
+    """
+    Append-only list of HistoryEntry with at most `memory_window` audio clips in memory
+
+    Args:
+        memory_window: Number of most recent turns whose audio stays in memory
+        spill_dir: Parent directory for the per-session spill directory
+    """
+
+    def __init__(self, memory_window: int = 10, spill_dir: str = None):
+        self.memory_window = max(0, memory_window)
+        self._spill_parent = spill_dir
+        self._spill_dir = None
+        self._entries = []
+        self._finalizer = None
+
+    def append(self, user: str, ai: str, audio: bytes, audio_mime: str = "audio/mpeg") -> HistoryEntry:
+        entry = HistoryEntry(user, ai, audio, audio_mime)
+        self._entries.append(entry)
+        self._enforce_window()
+        return entry
+
+    def _enforce_window(self):
+        # Entries are only ever appended, so everything before the window is already spilled
+        spill_index = len(self._entries) - self.memory_window - 1
+        if spill_index < 0:
+            return
+        entry = self._entries[spill_index]
+        if entry.spilled:
+            return
+        try:
+            entry.spill(os.path.join(self._ensure_spill_dir(), f"{spill_index:06d}.audio"))
+        except OSError as e:
+            # Keep the audio in memory rather than lose it
+            print(f"⚠️ Could not spill history audio to disk: {e}")
+
+    def _ensure_spill_dir(self) -> str:
+        if self._spill_dir is None:
+            if self._spill_parent:
+                os.makedirs(self._spill_parent, exist_ok=True)
+            self._spill_dir = tempfile.mkdtemp(prefix="history-", dir=self._spill_parent)
+            # Remove the files once the session (and with it this history) is gone
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        return self._spill_dir
+
+    def clear(self):
+        self._entries = []
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self._spill_dir = None
+
+    def stats(self) -> dict:
+        in_memory = [e for e in self._entries if not e.spilled]
+        return {
+            "entries": len(self._entries),
+            "in_memory": len(in_memory),
+            "memory_kb": round(sum(len(e._audio) for e in in_memory) / 1024, 2),
+            "spilled": len(self._entries) - len(in_memory)
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __reversed__(self):
+        return reversed(self._entries)
+
+    def __getitem__(self, index):
+        return self._entries[index]
@@ -0,0 +1,163 @@
+"""
+Minimal Prometheus metrics (counters, gauges, histograms) with text exposition
+
+Thread-safe, since stages are observed both on the event loop and on the
+audio worker threads. render() produces the text format served at /metrics.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds, from a cache hit to a long gTTS or Groq call
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Bytes, from a short transcript to a few minutes of audio
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base class: a named family of samples keyed by label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), registry=None):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self):
+        """Yield (suffix, label values, extra label, value) for exposition"""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield "", key, "", value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value: float, **labels):
+        """Mirror a monotonic count kept elsewhere (e.g. a cache's stats), refreshed at scrape time"""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Gauge(Metric):
+    """Value that goes up and down, or is set from some other source at scrape time"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets, with sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames, registry)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # Per-bucket counts (last one is +Inf), then the sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts)) for key, counts in self._values.items()]
+        for key, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts[:-1]):
+                cumulative += count
+                yield "_bucket", key, f'le="{_format_value(bound)}"', cumulative
+            yield "_sum", key, "", counts[-1]
+            yield "_count", key, "", cumulative
+
+
+class Registry:
+    """Ordered collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -1,13 +1,19 @@
 import streamlit as st
 import requests
-import base64
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from io import BytesIO
 from audio_recorder_streamlit import audio_recorder
-import speech_recognition as sr
 from pydub import AudioSegment
-import tempfile
 import os
+import threading
+import time
 from datetime import datetime
+from urllib.parse import unquote
+
+from audio_dsp import preprocess_speech
+from history_store import ConversationHistory
+from tracing import Tracer, get_span_sink
 
 # Page configuration
 st.set_page_config(
@@ -89,6 +95,18 @@ st.markdown('<p class="subtitle">Talk with AI using your microphone!</p>', unsaf
 
 # API endpoint (BASE API)
 API_URL = "http://localhost:8000/ask"
+API_BASE_URL = API_URL.rsplit('/', 1)[0]
+
+# Timeouts in seconds: connecting to the backend should be quick, reading waits for the stage
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUTS = {
+    "ask": 60,
+    "ask_audio": 90,
+    "transcribe": 30,
+    "respeed": 30,
+    "health": 2,
+    "session": 10
+}
 
 # Language mapping which supports multiple languages
 LANGUAGES = {
@@ -104,78 +122,297 @@ LANGUAGES = {
     "Chinese": "zh"
 }
 
+# Output formats the browser can play (the API also offers WebM Opus and raw PCM)
+AUDIO_FORMATS = {
+    "MP3": "mp3",
+    "MP3, low bitrate (mobile data)": "mp3_low",
+    "Opus (smallest)": "ogg_opus"
+}
+DEFAULT_AUDIO_FORMAT = os.getenv("AUDIO_FORMAT", "mp3")
+# File extension for the download button, by response media type
+AUDIO_EXTENSIONS = {"audio/mpeg": "mp3", "audio/ogg": "ogg", "audio/webm": "webm"}
+
+# One pooled keep-alive HTTP session for the whole Streamlit process, shared by every user session
+@st.cache_resource
+def get_http_session():
+    """Create the shared requests.Session with a bounded connection pool and retries"""
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        connect=3,
+        read=0,  # never resend a request the backend may already be working on
+        status=2,
+        # 429/503 are admission control shedding load: fail fast and show Retry-After instead
+        status_forcelist=(502, 504),
+        # POSTs (recordings, LLM/TTS work) are only resent when the connection failed
+        allowed_methods=frozenset({"GET"}),
+        backoff_factor=0.3,
+        backoff_jitter=0.3,
+        respect_retry_after_header=False,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, pool_block=False, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def api_timeout(stage):
+    """(connect, read) timeout tuple for an API stage"""
+    return (CONNECT_TIMEOUT, READ_TIMEOUTS[stage])
+
+# Client-side spans; the traceparent header links them to the API's spans
+@st.cache_resource
+def get_tracer():
+    return Tracer("streamlit", get_span_sink(os.getenv("TRACE_SINK", "none")))
+
+tracer = get_tracer()
+
+def api_post(url, stage, **kwargs):
+    """POST through the pooled session in a span whose trace context travels with the request"""
+    with tracer.span(f"POST {url.replace(API_BASE_URL, '')}") as span:
+        response = get_http_session().post(url, headers=tracer.inject(), timeout=api_timeout(stage), **kwargs)
+        span.set(
+            status=response.status_code,
+            response_bytes=len(response.content),
+            server_trace_id=response.headers.get("X-Trace-Id")
+        )
+        return response
+
+# Seconds between background health probes
+HEALTH_TTL = 10
+
+
+class HealthMonitor:
+    """
+    Probes the backend's /health on a background thread and keeps the last result,
+    so page reruns read a snapshot instead of waiting on the network
+    """
+    
+    def __init__(self, session, url, interval):
+        self.session = session
+        self.url = url
+        self.interval = interval
+        self._status = {"status": "unknown"}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while True:
+            self.probe()
+            time.sleep(self.interval)
+    
+    def probe(self):
+        start = time.monotonic()
+        try:
+            response = self.session.get(self.url, timeout=api_timeout("health"))
+            latency_ms = round((time.monotonic() - start) * 1000, 1)
+            if response.status_code == 200:
+                payload = response.json()
+                upstreams = payload.get("upstreams", {})
+                status = "degraded" if any(not u.get("reachable") for u in upstreams.values()) else "online"
+                result = {"status": status, "latency_ms": latency_ms, "upstreams": upstreams}
+            else:
+                result = {"status": "error", "latency_ms": latency_ms, "http_status": response.status_code}
+        except Exception as e:
+            result = {"status": "offline", "error": str(e)}
+        result["checked_at"] = time.time()
+        with self._lock:
+            self._status = result
+    
+    def snapshot(self):
+        with self._lock:
+            return dict(self._status)
+
+
+# One monitor per Streamlit process, shared by every user session
+@st.cache_resource
+def get_health_monitor():
+    return HealthMonitor(get_http_session(), f"{API_BASE_URL}/health", HEALTH_TTL)
+
+# Turns whose audio stays in memory; older audio is spilled to disk and read back on playback
+HISTORY_MEMORY_WINDOW = int(os.getenv("HISTORY_MEMORY_WINDOW", "10"))
+HISTORY_SPILL_DIR = os.getenv("HISTORY_SPILL_DIR") or None
+# Turns rendered per history page
+HISTORY_PAGE_SIZE = 10
+
 # Initialize session state
 if 'conversation_history' not in st.session_state:
-    st.session_state.conversation_history = []
+    st.session_state.conversation_history = ConversationHistory(HISTORY_MEMORY_WINDOW, HISTORY_SPILL_DIR)
 if 'last_response' not in st.session_state:
     st.session_state.last_response = None
 if 'interview_mode' not in st.session_state:
     st.session_state.interview_mode = False
 if 'interview_context' not in st.session_state:
     st.session_state.interview_context = ""
+if 'interview_session_id' not in st.session_state:
+    st.session_state.interview_session_id = None
 
 
-# this function will convert out input audio to text using speech recognition - it return text 
-def transcribe_audio(audio_bytes):
-    """Convert audio bytes to text using speech recognition"""
+def history_page(key, newest_first=False):
+    """
+    Show a page selector for the conversation history and return the current page
+    
+    Only this page's turns are rendered, so a rerun costs the same however long
+    the conversation gets.
+    
+    Returns:
+        List of (turn_number, HistoryEntry) for the selected page
+    """
+    history = st.session_state.conversation_history
+    total = len(history)
+    pages = max(1, -(-total // HISTORY_PAGE_SIZE))
+    page = 1
+    if pages > 1:
+        page = st.selectbox(f"Page (of {pages}):", range(1, pages + 1), key=f"{key}_page")
+    positions = range(total - 1, -1, -1) if newest_first else range(total)
+    start = (page - 1) * HISTORY_PAGE_SIZE
+    return [(i + 1, history[i]) for i in positions[start:start + HISTORY_PAGE_SIZE]]
+
+
+def history_audio(key, turn_number, entry):
+    """Attach a turn's audio only once the user asks to play it"""
+    if st.checkbox("🔊 Play audio", key=f"{key}_audio_{turn_number}"):
+        st.audio(entry.audio, format=entry.audio_mime)
+
+
+def selected_audio_format():
+    """The API audio_format picked in the sidebar (the sidebar renders after the tabs)"""
+    name = st.session_state.get("audio_format_name")
+    if name in AUDIO_FORMATS:
+        return AUDIO_FORMATS[name]
+    return DEFAULT_AUDIO_FORMAT
+
+
+def clear_history():
+    """Empty the history and forget the page and audio widgets that pointed into it"""
+    st.session_state.conversation_history.clear()
+    for widget_key in [k for k in st.session_state if str(k).startswith(("normal_history_", "interview_history_"))]:
+        del st.session_state[widget_key]
+
+
+# Shrink a recorder WAV before upload: 16 kHz mono, leading/trailing silence removed
+@tracer.traced()
+def prepare_recording(audio_bytes):
+    """Return the preprocessed WAV, or the original if it cannot be processed"""
     try:
-        recognizer = sr.Recognizer()
-        
-        # Save audio bytes to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-            tmp_file.write(audio_bytes)
-            tmp_path = tmp_file.name
-        
-        # it Loads our audio file
-        with sr.AudioFile(tmp_path) as source:
-            audio_data = recognizer.record(source)
-            
-        # Recognize speech using Google Speech Recognition
-        text = recognizer.recognize_google(audio_data)
+        processed, _ = preprocess_speech(audio_bytes)
+        return processed
+    except Exception:
+        return audio_bytes
+
+# this function will convert out input audio to text using the backend's /transcribe endpoint - it return text 
+@tracer.traced()
+def transcribe_audio(audio_bytes, language_code="en"):
+    """Convert audio bytes to text using the API's speech recognition"""
+    try:
+        # Upload 16 kHz mono with the silence trimmed, straight from memory (no temp file)
+        audio_bytes = prepare_recording(audio_bytes)
+        response = api_post(
+            f"{API_BASE_URL}/transcribe",
+            "transcribe",
+            files={"audio": ("recording.wav", audio_bytes, "audio/wav")},
+            data={"language": language_code}
+        )
         
-        # Clean up temp file
-        os.unlink(tmp_path)
+        if response.status_code == 200:
+            return response.json().get("transcript")
+        if response.status_code in (429, 503):
+            st.warning(f"⏳ The server is busy, please try again in {response.headers.get('Retry-After', 'a few')} seconds.")
+            return None
         
-        return text
-    
-    except sr.UnknownValueError:
-        return None
-    except sr.RequestError as e:
-        st.error(f"Could not request results from speech recognition service: {e}")
+        st.error(f"Could not request results from speech recognition service: {response.json().get('detail', 'Unknown error')}")
         return None
+    
     except Exception as e:
         st.error(f"Error transcribing audio: {str(e)}")
         return None
-    finally:
-        # Ensure our temp file is deleted properly
-        try:
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-        except:
-            pass
 
 
+# Build the response dict from a binary audio response and its X- metadata headers
+def parse_audio_response(response, speed, language_code):
+    """Turn a binary audio API response into the dict the UI works with"""
+    headers = response.headers
+    return {
+        "your_question": unquote(headers.get("X-Question", "")),
+        "ai_answer": unquote(headers.get("X-AI-Answer", "")),
+        "audio_bytes": response.content,
+        "audio_mime": headers.get("Content-Type", "audio/mpeg").split(";")[0].strip(),
+        "audio_size_kb": float(headers.get("X-Audio-Size-KB", 0)),
+        "speed": float(headers.get("X-Speed", speed)),
+        "language": unquote(headers.get("X-Language", language_code)),
+        "response_id": headers.get("X-Response-Id"),
+        "audio_format": headers.get("X-Audio-Format", "mp3"),
+        "transcript": unquote(headers.get("X-Transcript", ""))
+    }
+
 ## 
-def send_question_to_api(question, speed, language_code, context=""):
+@tracer.traced()
+def send_question_to_api(question, speed, language_code, session_id=None):
     """Send question to API and get response"""
     try:
-        # Add context if in interview mode
-        full_question = question
-        if context:
-            full_question = f"{context}\n\nUser: {question}"
-        
-        response = requests.post(
+        # Ask for raw audio bytes, the metadata comes back in X- headers
+        response = api_post(
             API_URL,
+            "ask",
+            data={
+                "question": question,
+                "speed": speed,
+                "language": language_code,
+                "response_format": "audio",
+                "audio_format": selected_audio_format(),
+                # Interview turns are answered with the server-side conversation history
+                "session_id": session_id
+            }
+        )
+        
+        if response.status_code == 200:
+            return parse_audio_response(response, speed, language_code)
+        elif response.status_code == 404 and session_id:
+            st.error("⌛ The interview session has expired. Please start a new interview.")
+            return None
+        elif response.status_code in (429, 503):
+            st.warning(f"⏳ The server is busy, please try again in {response.headers.get('Retry-After', 'a few')} seconds.")
+            return None
+        else:
+            st.error(f"API Error: {response.json().get('detail', 'Unknown error')}")
+            return None
+    except Exception as e:
+        st.error(f"Connection error: {str(e)}")
+        return None
+
+# Send a voice recording and get transcript, answer and audio back in one call
+@tracer.traced()
+def send_audio_to_api(audio_bytes, speed, language_code, prompt="{transcript}", session_id=None):
+    """Send a recording to /ask/audio; `{transcript}` in prompt is replaced server-side"""
+    try:
+        audio_bytes = prepare_recording(audio_bytes)
+        response = api_post(
+            f"{API_URL}/audio",
+            "ask_audio",
+            files={"audio": ("recording.wav", audio_bytes, "audio/wav")},
             data={
-                "question": full_question,
+                "prompt": prompt,
                 "speed": speed,
-                "language": language_code
-            },
-            timeout=60
+                "language": language_code,
+                "response_format": "audio",
+                "audio_format": selected_audio_format(),
+                "session_id": session_id
+            }
         )
         
         if response.status_code == 200:
-            return response.json()
+            return parse_audio_response(response, speed, language_code)
+        elif response.status_code == 422:
+            st.error("❌ Could not understand the audio. Please try again.")
+            return None
+        elif response.status_code == 404 and session_id:
+            st.error("⌛ The interview session has expired. Please start a new interview.")
+            return None
+        elif response.status_code in (429, 503):
+            st.warning(f"⏳ The server is busy, please try again in {response.headers.get('Retry-After', 'a few')} seconds.")
+            return None
         else:
             st.error(f"API Error: {response.json().get('detail', 'Unknown error')}")
             return None
@@ -183,6 +420,39 @@ def send_question_to_api(question, speed, language_code, context=""):
         st.error(f"Connection error: {str(e)}")
         return None
 
+# Start a conversation whose history the backend keeps (and summarizes when it grows)
+def create_api_session(system):
+    """Return a new session_id for `system` as the system prompt, or None on failure"""
+    try:
+        response = api_post(f"{API_BASE_URL}/sessions", "session", data={"system": system})
+        if response.status_code == 200:
+            return response.json()["session_id"]
+        st.error(f"API Error: {response.json().get('detail', 'Unknown error')}")
+    except Exception as e:
+        st.error(f"Connection error: {str(e)}")
+    return None
+
+# Re-render an answer at another speed from the backend's cached 1.0x master
+def respeed_response(data, speed):
+    """Return a copy of `data` with audio at the new speed, or None if it has expired"""
+    try:
+        response = get_http_session().get(
+            f"{API_BASE_URL}/respeed/{data['response_id']}",
+            params={"speed": speed, "audio_format": data.get("audio_format", "mp3")},
+            timeout=api_timeout("respeed")
+        )
+        if response.status_code != 200:
+            return None
+        return {
+            **data,
+            "audio_bytes": response.content,
+            "audio_mime": response.headers.get("Content-Type", "audio/mpeg").split(";")[0].strip(),
+            "audio_size_kb": float(response.headers.get("X-Audio-Size-KB", 0)),
+            "speed": speed
+        }
+    except Exception:
+        return None
+
 # Create tabs for different modes
 tab1, tab2 = st.tabs(["💬 Normal Conversation", "🎯 Interview Mode"])
 
@@ -206,7 +476,7 @@ with tab1:
             st.audio(audio_bytes, format="audio/wav")
             
             if st.button("🔄 Transcribe & Send", type="primary", use_container_width=True):
-                with st.spinner("🎧 Transcribing your voice..."):
+                with st.spinner("🎧 Transcribing your voice..."), tracer.span("ui.voice_question"):
                     transcribed_text = transcribe_audio(audio_bytes)
                     
                     if transcribed_text:
@@ -243,6 +513,13 @@ with tab1:
             key="normal_speed"
         )
         
+        # Moving the slider only re-times the latest answer, no new question is sent
+        last = st.session_state.last_response
+        if last and last.get('response_id') and last.get('speed') != speed:
+            respeeded = respeed_response(last, speed)
+            if respeeded:
+                st.session_state.last_response = respeeded
+        
         # Language selector list box
         st.markdown("### 🌍 Language")
         language_name = st.selectbox(
@@ -257,16 +534,12 @@ with tab1:
         generate_btn = st.button("🚀 Generate Response", type="primary", use_container_width=True, key="normal_generate")
         
         if generate_btn and question.strip():
-            with st.spinner(f"🔄 Generating response at {speed}x speed..."):
+            with st.spinner(f"🔄 Generating response at {speed}x speed..."), tracer.span("ui.generate_response"):
                 data = send_question_to_api(question, speed, language_code)
                 
                 if data:
                     st.session_state.last_response = data
-                    st.session_state.conversation_history.append({
-                        "user": question,
-                        "ai": data['ai_answer'],
-                        "audio": data['audio_base64']
-                    })
+                    st.session_state.conversation_history.append(question, data['ai_answer'], data['audio_bytes'], data['audio_mime'])
                     st.success("✅ Response generated!")
                     st.session_state.current_question = ""
                     st.rerun()
@@ -285,14 +558,15 @@ with tab1:
             
             st.markdown("#### 🔊 Audio Response:")
             try:
-                audio_bytes = base64.b64decode(data['audio_base64'])
-                st.audio(audio_bytes, format='audio/mp3')
+                audio_bytes = data['audio_bytes']
+                audio_mime = data.get('audio_mime', 'audio/mpeg')
+                st.audio(audio_bytes, format=audio_mime)
                 
                 st.download_button(
                     label="📥 Download Audio",
                     data=audio_bytes,
-                    file_name=f"response_{data.get('speed', 1.0)}x.mp3",
-                    mime="audio/mp3",
+                    file_name=f"response_{data.get('speed', 1.0)}x.{AUDIO_EXTENSIONS.get(audio_mime, 'mp3')}",
+                    mime=audio_mime,
                     use_container_width=True
                 )
             except Exception as e:
@@ -303,17 +577,16 @@ with tab1:
             st.markdown("### 📜 Conversation History")
             
             if st.button("🗑️ Clear History", use_container_width=True):
-                st.session_state.conversation_history = []
+                clear_history()
                 st.rerun()
             
             st.markdown("<div class='conversation-history'>", unsafe_allow_html=True)
-            for i, conv in enumerate(reversed(st.session_state.conversation_history)):
-                st.markdown(f"**You:** {conv['user']}")
-                st.markdown(f"**AI:** {conv['ai']}")
+            for turn_number, conv in history_page("normal_history", newest_first=True):
+                st.markdown(f"**You:** {conv.user}")
+                st.markdown(f"**AI:** {conv.ai}")
                 
                 # Play button for each conversation
-                audio_bytes = base64.b64decode(conv['audio'])
-                st.audio(audio_bytes, format='audio/mp3')
+                history_audio("normal_history", turn_number, conv)
                 st.markdown("---")
             st.markdown("</div>", unsafe_allow_html=True)
 
@@ -342,17 +615,17 @@ Ask relevant questions one at a time. After the candidate answers, provide const
 on their response and ask the next question. Be professional but encouraging."""
             
             # Generate first question
-            with st.spinner("Preparing interview..."):
+            with st.spinner("Preparing interview..."), tracer.span("ui.start_interview"):
+                # The interview brief becomes the session's system prompt, sent once
+                st.session_state.interview_session_id = create_api_session(st.session_state.interview_context)
                 first_q = f"Please ask me the first {interview_type} interview question."
-                data = send_question_to_api(first_q, 1.0, "en", st.session_state.interview_context)
+                data = None
+                if st.session_state.interview_session_id:
+                    data = send_question_to_api(first_q, 1.0, "en", st.session_state.interview_session_id)
                 
                 if data:
-                    st.session_state.conversation_history = []
-                    st.session_state.conversation_history.append({
-                        "user": "Start Interview",
-                        "ai": data['ai_answer'],
-                        "audio": data['audio_base64']
-                    })
+                    clear_history()
+                    st.session_state.conversation_history.append("Start Interview", data['ai_answer'], data['audio_bytes'], data['audio_mime'])
                     st.session_state.last_response = data
                     st.rerun()
         
@@ -373,24 +646,15 @@ on their response and ask the next question. Be professional but encouraging."""
                 st.audio(interview_audio, format="audio/wav")
                 
                 if st.button("✅ Submit Answer", type="primary", use_container_width=True, key="submit_interview"):
-                    with st.spinner("🎧 Processing your answer..."):
-                        answer_text = transcribe_audio(interview_audio)
+                    with st.spinner("🎧 Processing your answer..."), tracer.span("ui.interview_turn"):
+                        # Transcription, feedback and speech happen in a single API call
+                        feedback_prompt = "My answer: {transcript}\n\nPlease provide feedback on my answer and ask the next question."
+                        data = send_audio_to_api(interview_audio, 1.0, "en", feedback_prompt, st.session_state.interview_session_id)
                         
-                        if answer_text:
-                            st.success(f"✅ Your answer: {answer_text}")
-                            
-                            # Send answer and get feedback
-                            feedback_prompt = f"My answer: {answer_text}\n\nPlease provide feedback on my answer and ask the next question."
-                            data = send_question_to_api(feedback_prompt, 1.0, "en", st.session_state.interview_context)
-                            
-                            if data:
-                                st.session_state.conversation_history.append({
-                                    "user": answer_text,
-                                    "ai": data['ai_answer'],
-                                    "audio": data['audio_base64']
-                                })
-                                st.session_state.last_response = data
-                                st.rerun()
+                        if data:
+                            st.session_state.conversation_history.append(data['transcript'], data['ai_answer'], data['audio_bytes'], data['audio_mime'])
+                            st.session_state.last_response = data
+                            st.rerun()
             
             st.markdown("#### 🗨️ Or Type Your Answer")
             typed_answer = st.text_area(
@@ -402,28 +666,20 @@ on their response and ask the next question. Be professional but encouraging."""
             if st.button("📤 Send Typed Answer", use_container_width=True):
                 if typed_answer.strip():
                     feedback_prompt = f"My answer: {typed_answer}\n\nPlease provide feedback and ask the next question."
-                    data = send_question_to_api(feedback_prompt, 1.0, "en", st.session_state.interview_context)
+                    data = send_question_to_api(feedback_prompt, 1.0, "en", st.session_state.interview_session_id)
                     
                     if data:
-                        st.session_state.conversation_history.append({
-                            "user": typed_answer,
-                            "ai": data['ai_answer'],
-                            "audio": data['audio_base64']
-                        })
+                        st.session_state.conversation_history.append(typed_answer, data['ai_answer'], data['audio_bytes'], data['audio_mime'])
                         st.session_state.last_response = data
                         st.rerun()
             
             if st.button("🛑 End Interview", use_container_width=True):
                 # Get final feedback
                 final_prompt = "Please provide overall feedback on my interview performance."
-                data = send_question_to_api(final_prompt, 1.0, "en", st.session_state.interview_context)
+                data = send_question_to_api(final_prompt, 1.0, "en", st.session_state.interview_session_id)
                 
                 if data:
-                    st.session_state.conversation_history.append({
-                        "user": "End Interview",
-                        "ai": data['ai_answer'],
-                        "audio": data['audio_base64']
-                    })
+                    st.session_state.conversation_history.append("End Interview", data['ai_answer'], data['audio_bytes'], data['audio_mime'])
                     st.session_state.last_response = data
                     st.session_state.interview_mode = False
                     st.rerun()
@@ -438,8 +694,8 @@ on their response and ask the next question. Be professional but encouraging."""
             st.markdown(f"<div class='success-box'>{data['ai_answer']}</div>", unsafe_allow_html=True)
             
             try:
-                audio_bytes = base64.b64decode(data['audio_base64'])
-                st.audio(audio_bytes, format='audio/mp3')
+                audio_bytes = data['audio_bytes']
+                st.audio(audio_bytes, format=data.get('audio_mime', 'audio/mpeg'))
             except Exception as e:
                 st.error(f"Error playing audio: {str(e)}")
         
@@ -447,12 +703,11 @@ on their response and ask the next question. Be professional but encouraging."""
         if st.session_state.conversation_history:
             st.markdown("#### 📝 Interview Transcript")
             
-            for i, conv in enumerate(st.session_state.conversation_history):
-                with st.expander(f"Q{i+1}: {conv['user'][:50]}..."):
-                    st.markdown(f"**Your Response:** {conv['user']}")
-                    st.markdown(f"**Feedback:** {conv['ai']}")
-                    audio_bytes = base64.b64decode(conv['audio'])
-                    st.audio(audio_bytes, format='audio/mp3')
+            for turn_number, conv in history_page("interview_history"):
+                with st.expander(f"Q{turn_number}: {conv.user[:50]}..."):
+                    st.markdown(f"**Your Response:** {conv.user}")
+                    st.markdown(f"**Feedback:** {conv.ai}")
+                    history_audio("interview_history", turn_number, conv)
 
 # Sidebar
 with st.sidebar:
@@ -471,14 +726,32 @@ with st.sidebar:
     """)
     
     st.markdown("### 📊 API Status")
-    try:
-        health_response = requests.get(f"{API_URL.rsplit('/', 1)[0]}/health", timeout=2)
-        if health_response.status_code == 200:
-            st.success("🟢 API is running")
-        else:
-            st.error("🔴 API error")
-    except:
+    # Read the background probe's last result, this never blocks the page
+    health = get_health_monitor().snapshot()
+    if health["status"] == "online":
+        st.success(f"🟢 API is running ({health['latency_ms']:.0f} ms)")
+    elif health["status"] == "degraded":
+        down = [name for name, u in health["upstreams"].items() if not u.get("reachable")]
+        st.warning(f"🟡 API is running, upstream issues: {', '.join(down)}")
+    elif health["status"] == "unknown":
+        st.info("⚪ Checking API status...")
+    elif health["status"] == "error":
+        st.error("🔴 API error")
+    else:
         st.error("🔴 API is offline")
+    if "checked_at" in health:
+        st.caption(f"Checked {time.time() - health['checked_at']:.0f}s ago")
+    
+    st.markdown("### 🔊 Audio Quality")
+    format_names = list(AUDIO_FORMATS)
+    default_names = [name for name, value in AUDIO_FORMATS.items() if value == DEFAULT_AUDIO_FORMAT]
+    st.selectbox(
+        "Response audio format:",
+        format_names,
+        index=format_names.index(default_names[0]) if default_names else 0,
+        key="audio_format_name",
+        help="Opus is the smallest download, low-bitrate MP3 plays everywhere; both help on mobile data"
+    )
     
     st.markdown("### 🎯 Tips")
     st.markdown("""
@@ -0,0 +1,136 @@
+"""
+Speech-to-text backends
+
+Each backend turns recorded audio into text and reports what it can do, so a
+deployment can use Google's free endpoint or run fully offline (Vosk,
+PocketSphinx) with the STT_BACKEND setting.
+"""
+import json
+import os
+from io import BytesIO
+
+import speech_recognition as sr
+
+
+def load_audio(audio_bytes: bytes) -> sr.AudioData:
+    """Read WAV/AIFF/FLAC bytes into AudioData straight from memory (no temp file)"""
+    recognizer = sr.Recognizer()
+    with sr.AudioFile(BytesIO(audio_bytes)) as source:
+        return recognizer.record(source)
+
+
+class STTBackend:
+    """Base class for speech recognition engines"""
+
+    name = "base"
+    # Needs network access to transcribe
+    remote = False
+    languages = frozenset()
+
+    def transcribe(self, audio_data: sr.AudioData, language: str):
+        """
+        Convert speech to text
+
+        Args:
+            audio_data: Recorded audio
+            language: Language code (en, bn, hi, ...)
+
+        Returns:
+            The transcript, or None if no speech could be recognized
+        """
+        raise NotImplementedError
+
+    def capabilities(self) -> dict:
+        return {
+            "name": self.name,
+            "languages": sorted(self.languages),
+            "remote": self.remote
+        }
+
+
+class GoogleSTTBackend(STTBackend):
+    """Google Web Speech API (the free endpoint used by SpeechRecognition)"""
+
+    name = "google"
+    remote = True
+
+    LOCALES = {
+        "en": "en-US",
+        "bn": "bn-BD",
+        "hi": "hi-IN",
+        "es": "es-ES",
+        "fr": "fr-FR",
+        "de": "de-DE",
+        "it": "it-IT",
+        "ja": "ja-JP",
+        "ko": "ko-KR",
+        "zh": "zh-CN"
+    }
+    languages = frozenset(LOCALES)
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, audio_data: sr.AudioData, language: str):
+        try:
+            return self.recognizer.recognize_google(audio_data, language=self.LOCALES.get(language, "en-US"))
+        except sr.UnknownValueError:
+            return None
+
+
+class SphinxSTTBackend(STTBackend):
+    """CMU PocketSphinx: offline, English only, low accuracy but no model download"""
+
+    name = "sphinx"
+    remote = False
+    languages = frozenset(["en"])
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, audio_data: sr.AudioData, language: str):
+        try:
+            return self.recognizer.recognize_sphinx(audio_data, language="en-US") or None
+        except sr.UnknownValueError:
+            return None
+
+
+class VoskSTTBackend(STTBackend):
+    """Vosk (Kaldi): offline with a downloaded model, set VOSK_MODEL_PATH"""
+
+    name = "vosk"
+    remote = False
+    # Vosk listens at the model's native rate, 16 kHz for the small models
+    SAMPLE_RATE = 16000
+
+    def __init__(self, model_path: str = None, language: str = None):
+        from vosk import Model, SetLogLevel
+
+        SetLogLevel(-1)
+        self.model = Model(model_path or os.getenv("VOSK_MODEL_PATH", "model"))
+        # A Vosk model covers a single language
+        self.languages = frozenset([language or os.getenv("VOSK_LANGUAGE", "en")])
+
+    def transcribe(self, audio_data: sr.AudioData, language: str):
+        from vosk import KaldiRecognizer
+
+        recognizer = KaldiRecognizer(self.model, self.SAMPLE_RATE)
+        recognizer.AcceptWaveform(audio_data.get_raw_data(convert_rate=self.SAMPLE_RATE, convert_width=2))
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        return text or None
+
+
+STT_BACKENDS = {
+    "google": GoogleSTTBackend,
+    "sphinx": SphinxSTTBackend,
+    "vosk": VoskSTTBackend
+}
+
+
+def get_stt_backend(name: str) -> STTBackend:
+    """Create the backend registered under `name` (case-insensitive)"""
+    try:
+        backend_class = STT_BACKENDS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown STT backend '{name}', choose from: {', '.join(STT_BACKENDS)}")
+    return backend_class()
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def full_tts_gate(monkeypatch):
+    """A TTS gate with one slot and no queue, so any gated call is rejected while it is held"""
+    gate = app.AdmissionGate("tts", limit=1, max_queue=0, queue_timeout=0.1)
+    monkeypatch.setitem(app.admission, "tts", gate)
+    return gate
+
+
+def test_cached_sentence_skips_full_tts_gate(full_tts_gate, monkeypatch):
+    monkeypatch.setattr(app, "synthesize_speech", lambda text, language: pytest.fail("TTS should not run"))
+    # A memory hit must not queue behind the syntheses on the worker pool either
+    monkeypatch.setattr(app, "run_blocking", lambda *args, **kwargs: pytest.fail("Cache hit left the event loop"))
+    app.tts_cache.put(app.tts_cache_key("Cached sentence.", "en", 1.0), b"cached-mp3")
+
+    async def scenario():
+        async with full_tts_gate.slot():
+            return await app.sentence_chunk_audio("Cached sentence.", "en", 1.0)
+
+    assert asyncio.run(scenario()) == b"cached-mp3"
+    assert full_tts_gate.rejected == 0
+
+
+def test_uncached_sentence_is_rejected_by_full_tts_gate(full_tts_gate, monkeypatch):
+    monkeypatch.setattr(app, "synthesize_speech", lambda text, language: b"fresh-mp3")
+
+    async def scenario():
+        async with full_tts_gate.slot():
+            return await app.sentence_chunk_audio("Sentence nobody asked for yet.", "en", 1.0)
+
+    with pytest.raises(app.Overloaded):
+        asyncio.run(scenario())
+    assert full_tts_gate.rejected == 1
+
+
+def test_cached_answer_stays_fast_while_tts_is_saturated(monkeypatch, tmp_path):
+    synthesizing = threading.Semaphore(0)
+    release_tts = threading.Event()
+
+    def slow_synthesize(text, language):
+        synthesizing.release()
+        release_tts.wait(5)
+        return b"fresh-mp3"
+
+    async def fake_generate_answer(question, use_cache=True, session=None):
+        return f"Answer to {question}", False
+
+    monkeypatch.setattr(app, "generate_answer", fake_generate_answer)
+    monkeypatch.setattr(app, "synthesize_speech", slow_synthesize)
+    # Only on disk, so the cached answer needs a worker thread to read it
+    app.AudioCache(max_bytes=1024 * 1024, disk_dir=str(tmp_path)).put(
+        app.tts_cache_key("Answer to cached?", "en", 1.0), b"cached-mp3"
+    )
+    monkeypatch.setattr(app, "tts_cache", app.AudioCache(max_bytes=1024 * 1024, disk_dir=str(tmp_path)))
+
+    async def scenario():
+        tts_limit = app.admission["tts"].limit
+        syntheses = [
+            asyncio.ensure_future(app.answer_and_speak(f"uncached {i}?", 1.0, "en")) for i in range(tts_limit)
+        ]
+        for _ in range(tts_limit):
+            await asyncio.to_thread(synthesizing.acquire)
+        start = time.monotonic()
+        _, audio_bytes = await app.answer_and_speak("cached?", 1.0, "en")
+        elapsed = time.monotonic() - start
+        release_tts.set()
+        await asyncio.gather(*syntheses)
+        return audio_bytes, elapsed
+
+    audio_bytes, elapsed = asyncio.run(scenario())
+    assert audio_bytes == b"cached-mp3"
+    assert elapsed < 1.0
@@ -0,0 +1,19 @@
+import asyncio
+
+import app
+
+
+def test_each_answer_counts_one_tts_lookup(monkeypatch):
+    async def fake_generate_answer(question, use_cache=True, session=None):
+        return "A counted answer.", False
+
+    monkeypatch.setattr(app, "generate_answer", fake_generate_answer)
+    monkeypatch.setattr(app, "synthesize_speech", lambda text, language: b"master-mp3")
+    monkeypatch.setattr(app, "tts_cache", app.AudioCache(max_bytes=1024 * 1024))
+
+    for _ in range(2):
+        asyncio.run(app.answer_and_speak("Count me?", 1.0, "en"))
+
+    stats = app.tts_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_ratio"] == 0.5
@@ -0,0 +1,65 @@
+import wave
+from io import BytesIO
+
+import numpy as np
+from pydub import AudioSegment
+
+from audio_dsp import array_to_segment, float_to_pcm, pcm_to_float, preprocess_speech, segment_to_array
+
+
+def tone(seconds=1.0, rate=16000, silence=0.25):
+    """A 220 Hz tone with silence on both sides, as floats in [-1, 1]"""
+    t = np.arange(int(seconds * rate)) / rate
+    samples = 0.5 * np.sin(2 * np.pi * 220 * t)
+    padding = np.zeros(int(silence * rate))
+    return np.concatenate([padding, samples, padding])
+
+
+def wav_bytes(samples, rate, sample_width):
+    scale = float(1 << (8 * sample_width - 1))
+    pcm = np.round(samples * (scale - 1)).astype("<i4")
+    # Low bytes of each little-endian int32 give 16-bit or 24-bit samples
+    raw = pcm.view(np.uint8).reshape(-1, 4)[:, :sample_width].tobytes()
+    output_buffer = BytesIO()
+    with wave.open(output_buffer, "wb") as target:
+        target.setnchannels(1)
+        target.setsampwidth(sample_width)
+        target.setframerate(rate)
+        target.writeframes(raw)
+    return output_buffer.getvalue()
+
+
+def test_preprocess_speech_accepts_24_bit_wav():
+    samples = tone()
+    processed_24, stats_24 = preprocess_speech(wav_bytes(samples, 16000, 3))
+    processed_16, stats_16 = preprocess_speech(wav_bytes(samples, 16000, 2))
+
+    assert stats_24["speech_detected"]
+    assert stats_24["processed_seconds"] == stats_16["processed_seconds"]
+    with wave.open(BytesIO(processed_24), "rb") as result:
+        assert result.getsampwidth() == 2
+        out_24 = np.frombuffer(result.readframes(result.getnframes()), dtype="<i2")
+    with wave.open(BytesIO(processed_16), "rb") as result:
+        out_16 = np.frombuffer(result.readframes(result.getnframes()), dtype="<i2")
+    assert np.abs(out_24.astype(int) - out_16.astype(int)).max() <= 1
+
+
+def test_24_bit_pcm_round_trip():
+    samples = tone(silence=0)
+    with wave.open(BytesIO(wav_bytes(samples, 16000, 3)), "rb") as source:
+        raw = source.readframes(source.getnframes())
+
+    floats = pcm_to_float(raw, 3)
+    assert np.allclose(floats, samples, atol=1e-5)
+    assert float_to_pcm(floats, 3) == raw
+
+
+def test_24_bit_wav_segment_round_trip():
+    samples = tone(silence=0)
+    # pydub widens 24-bit audio to 32-bit samples
+    segment = AudioSegment.from_wav(BytesIO(wav_bytes(samples, 16000, 3)))
+
+    array = segment_to_array(segment)
+    assert array.shape == (len(samples), 1)
+    assert np.allclose(array[:, 0], samples, atol=1e-5)
+    assert array_to_segment(array, segment).frame_count() == segment.frame_count()
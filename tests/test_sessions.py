@@ -0,0 +1,42 @@
+import asyncio
+import types
+
+import app
+
+
+def completion(text):
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=text))])
+
+
+def test_session_answers_while_summary_is_written(monkeypatch):
+    summary_started = asyncio.Event()
+    release_summary = asyncio.Event()
+
+    async def fake_llm_completion(messages, max_tokens=None, temperature=None, stream=False):
+        if messages[0]["content"].startswith("You keep the memory"):
+            summary_started.set()
+            await release_summary.wait()
+            return completion("Summary of the early turns.")
+        return completion("Next answer.")
+
+    monkeypatch.setattr(app, "llm_completion", fake_llm_completion)
+    session = app.ConversationSession("test-session")
+    for i in range(app.SESSION_KEEP_TURNS + 2):
+        session.add_turn(f"Question {i} " + "word " * 400, f"Answer {i} " + "word " * 400)
+
+    async def scenario():
+        compaction = asyncio.ensure_future(app.compact_session(session))
+        await summary_started.wait()
+        # The summary call is still running; the next turn must not wait for it
+        answer = await asyncio.wait_for(app.session_answer(session, "Follow-up?"), 1.0)
+        release_summary.set()
+        await compaction
+        return answer
+
+    assert asyncio.run(scenario()) == "Next answer."
+    assert session.summary == "Summary of the early turns."
+    assert session.compactions == 1
+    # The turns kept verbatim plus the one answered during the summary
+    assert len(session.turns) == app.SESSION_KEEP_TURNS + 1
+    assert session.turns[-1] == ("Follow-up?", "Next answer.")
+    assert not session.compacting
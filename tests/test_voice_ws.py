@@ -0,0 +1,96 @@
+import asyncio
+import json
+import types
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+
+SAMPLE_RATE = 16000
+FRAME_BYTES = 640
+
+
+def pcm(seconds: float, amplitude: float) -> bytes:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 200 * t) * 32767).astype("<i2").tobytes()
+
+
+def send_pcm(ws, audio: bytes):
+    for i in range(0, len(audio), FRAME_BYTES):
+        ws.send_bytes(audio[i:i + FRAME_BYTES])
+
+
+def receive_until(ws, event_type: str, limit: int = 20) -> list:
+    """JSON events up to and including the first of event_type; binary audio is kept as bytes"""
+    events = []
+    for _ in range(limit):
+        message = ws.receive()
+        events.append(message["bytes"] if message.get("bytes") is not None else json.loads(message["text"]))
+        if isinstance(events[-1], dict) and events[-1]["type"] == event_type:
+            return events
+    pytest.fail(f"No {event_type} event in {events}")
+
+
+@pytest.fixture
+def voice_client(monkeypatch):
+    """Voice WebSocket with stubbed Groq, TTS and STT; the "slow" question never finishes"""
+    class Chunk:
+        def __init__(self, text):
+            self.choices = [types.SimpleNamespace(delta=types.SimpleNamespace(content=text))]
+
+    async def create(messages, **kwargs):
+        slow = "slow" in messages[-1]["content"]
+
+        async def stream():
+            for part in ["Hello there. ", "How are you?"]:
+                await asyncio.sleep(30 if slow else 0.01)
+                yield Chunk(part)
+        return stream()
+
+    transcripts = iter(["first question", "slow question"])
+    monkeypatch.setattr(app, "groq_client", types.SimpleNamespace(
+        chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create))
+    ))
+    monkeypatch.setattr(app.stt_backend, "transcribe", lambda audio, language: next(transcripts))
+    monkeypatch.setattr(app, "synthesize_speech", lambda text, language: b"MP3:" + text.encode("utf-8"))
+    monkeypatch.setattr(app, "tts_cache", app.AudioCache(max_bytes=1024 * 1024))
+    monkeypatch.setattr(app.VoiceSession, "PARTIAL_INTERVAL", 0)
+    return TestClient(app.app)
+
+
+def test_utterance_is_answered_and_barge_in_cancels(voice_client):
+    speech, silence = pcm(1.0, 0.3), pcm(1.0, 0.0)
+    with voice_client.websocket_connect("/ws/voice") as ws:
+        assert ws.receive_json()["type"] == "ready"
+        ws.send_json({"type": "start", "sample_rate": SAMPLE_RATE})
+        assert ws.receive_json()["type"] == "ready"
+
+        send_pcm(ws, speech + silence)
+        events = receive_until(ws, "done")
+        kinds = [event["type"] for event in events if isinstance(event, dict)]
+        assert kinds == ["speech_start", "speech_end", "transcript", "audio", "audio", "done"]
+        assert events[2] == {"type": "transcript", "text": "first question", "final": True}
+        assert events[3]["text"] == "Hello there." and events[3]["format"] == "mp3"
+        assert events[4] == b"MP3:Hello there."
+        assert events[-1]["ai_answer"] == "Hello there. How are you?"
+
+        # The second answer is still waiting on the LLM when the user talks again
+        send_pcm(ws, speech + silence)
+        assert receive_until(ws, "transcript")[-1]["text"] == "slow question"
+        send_pcm(ws, speech)
+        assert receive_until(ws, "cancelled")[-2:] == [
+            {"type": "speech_start"}, {"type": "cancelled", "reason": "barge_in"}
+        ]
+
+
+def test_malformed_control_messages_get_errors(voice_client):
+    with voice_client.websocket_connect("/ws/voice") as ws:
+        ws.receive_json()
+        ws.send_text("not json")
+        assert ws.receive_json() == {"type": "error", "detail": "Control messages must be JSON objects"}
+        ws.send_json({"type": "start", "audio_format": "flac"})
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"type": "start"})
+        assert ws.receive_json()["audio_format"] == "mp3"
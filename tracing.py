@@ -0,0 +1,232 @@
+"""
+Lightweight request tracing shared by the API and the Streamlit app
+
+Spans nest through a context variable, so a span opened inside another (or
+inside a coroutine or worker thread started from it) becomes its child.
+Trace context crosses from the frontend to the backend in a W3C
+`traceparent` header. Finished spans go to a pluggable sink, selected with
+TRACE_SINK ("none" or "jsonl", which appends one JSON object per span to
+TRACE_FILE).
+
+    python tracing.py traces.jsonl [trace_id]
+
+prints the span tree of the slowest (or the given) trace from a JSON-lines file.
+"""
+import contextvars
+import functools
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+TRACEPARENT_HEADER = "traceparent"
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = ("service", "name", "trace_id", "span_id", "parent_id",
+                 "start", "duration_ms", "attributes", "error", "_started")
+
+    def __init__(self, service: str, name: str, trace_id: str, parent_id: str = None, attributes: dict = None):
+        self.service = service
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.duration_ms = None
+        self.attributes = attributes or {}
+        self.error = None
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "service": self.service,
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+class SpanSink:
+    """Where finished spans go; subclass and pass to Tracer to export elsewhere"""
+
+    name = "none"
+
+    def export(self, span: Span):
+        pass
+
+
+class JSONLinesSink(SpanSink):
+    """Append each span as one JSON line to a local file, for offline analysis"""
+
+    name = "jsonl"
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("TRACE_FILE", "traces.jsonl")
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                # Opened once and line-buffered: each span is flushed as one appended line,
+                # so the API and the Streamlit app can share a file
+                self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+            self._file.write(line)
+
+
+SPAN_SINKS = {
+    "none": SpanSink,
+    "jsonl": JSONLinesSink
+}
+
+
+def get_span_sink(name: str) -> SpanSink:
+    """Create the sink registered under `name` (case-insensitive)"""
+    try:
+        sink_class = SPAN_SINKS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown trace sink '{name}', choose from: {', '.join(SPAN_SINKS)}")
+    return sink_class()
+
+
+def parse_traceparent(value: str):
+    """Return (trace_id, parent span_id) from a traceparent header, or None if invalid"""
+    match = TRACEPARENT.match((value or "").strip().lower())
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+
+class Tracer:
+    """Creates spans for one service and hands them to its sink when they finish"""
+
+    def __init__(self, service: str, sink: SpanSink = None):
+        self.service = service
+        self.sink = sink or SpanSink()
+
+    @contextmanager
+    def span(self, name: str, traceparent: str = None, **attributes):
+        """
+        Time the enclosed block as a span
+
+        Args:
+            name: Operation name
+            traceparent: Remote parent (incoming header); by default the current span is the parent
+            attributes: Extra fields recorded with the span
+
+        Yields:
+            The Span, so the block can add attributes
+        """
+        remote = parse_traceparent(traceparent) if traceparent else None
+        parent = _current_span.get()
+        if remote is not None:
+            trace_id, parent_id = remote
+        elif parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+
+        span = Span(self.service, name, trace_id, parent_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.finish()
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Generator resumed in another context; the span is still exported
+                pass
+            try:
+                self.sink.export(span)
+            except Exception as e:
+                print(f"⚠️ Could not export span {name}: {str(e)}")
+
+    def traced(self, name: str = None):
+        """Decorator that runs each call of a function in a span"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name or func.__name__):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def inject(self, headers: dict = None) -> dict:
+        """Add the current span's traceparent to outgoing request headers"""
+        headers = dict(headers or {})
+        span = _current_span.get()
+        if span is not None:
+            headers[TRACEPARENT_HEADER] = span.traceparent()
+        return headers
+
+
+def current_span():
+    """The innermost open span, or None"""
+    return _current_span.get()
+
+
+def print_trace(spans: list):
+    """Print a trace as an indented tree with durations"""
+    children = {}
+    for span in spans:
+        children.setdefault(span["parent_id"], []).append(span)
+    ids = {span["span_id"] for span in spans}
+
+    def walk(span, depth):
+        error = f"  ❌ {span['error']}" if span.get("error") else ""
+        print(f"{'  ' * depth}{span['duration_ms']:>10.1f} ms  {span['service']}:{span['name']}{error}")
+        for child in sorted(children.get(span["span_id"], []), key=lambda s: s["start"]):
+            walk(child, depth + 1)
+
+    roots = [span for span in spans if span["parent_id"] not in ids]
+    for root in sorted(roots, key=lambda s: s["start"]):
+        walk(root, 0)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python tracing.py traces.jsonl [trace_id]")
+
+    traces = {}
+    with open(sys.argv[1], encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                traces.setdefault(span["trace_id"], []).append(span)
+
+    if len(sys.argv) > 2:
+        trace_id = sys.argv[2]
+    else:
+        # Slowest trace by its longest span
+        trace_id = max(traces, key=lambda t: max(s["duration_ms"] or 0 for s in traces[t]))
+    print(f"Trace {trace_id}")
+    print_trace(traces[trace_id])
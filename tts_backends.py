@@ -0,0 +1,128 @@
+"""
+Text-to-speech backends
+
+Each backend turns text into audio bytes and reports what it can do, so a
+deployment can pick voice quality (gTTS) or latency and offline use (espeak-ng)
+with the TTS_BACKEND setting.
+"""
+import shutil
+import subprocess
+from io import BytesIO
+
+from gtts import gTTS
+
+
+class TTSBackend:
+    """Base class for TTS engines"""
+
+    name = "base"
+    # Native output format of synthesize(): "mp3" or "wav"
+    output_format = "mp3"
+    # Whether stream() yields audio before the whole text is synthesized
+    streaming = False
+    # Needs network access to synthesize
+    remote = False
+    languages = frozenset()
+
+    def synthesize(self, text: str, language: str) -> bytes:
+        """
+        Convert text to audio bytes in `output_format`
+
+        Args:
+            text: Text to speak
+            language: Language code (en, bn, hi, ...)
+
+        Returns:
+            Audio bytes
+        """
+        raise NotImplementedError
+
+    def stream(self, text: str, language: str):
+        """Yield audio byte chunks; backends without native streaming yield one chunk"""
+        yield self.synthesize(text, language)
+
+    def capabilities(self) -> dict:
+        return {
+            "name": self.name,
+            "languages": sorted(self.languages),
+            "output_format": self.output_format,
+            "streaming": self.streaming,
+            "remote": self.remote
+        }
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS: natural voices, one HTTPS round trip per ~100 characters"""
+
+    name = "gTTS"
+    output_format = "mp3"
+    streaming = True
+    remote = True
+    languages = frozenset(["en", "bn", "hi", "es", "fr", "de", "it", "ja", "ko", "zh"])
+
+    def synthesize(self, text: str, language: str) -> bytes:
+        audio_buffer = BytesIO()
+        gTTS(text=text, lang=language).write_to_fp(audio_buffer)
+        return audio_buffer.getvalue()
+
+    def stream(self, text: str, language: str):
+        # gTTS fetches the text in parts and can hand each part over as it arrives
+        yield from gTTS(text=text, lang=language).stream()
+
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng: fully local formant synthesis, robotic but fast and offline"""
+
+    name = "espeak-ng"
+    output_format = "wav"
+    streaming = False
+    remote = False
+
+    # espeak-ng voice names for our language codes
+    VOICES = {
+        "en": "en-us",
+        "bn": "bn",
+        "hi": "hi",
+        "es": "es",
+        "fr": "fr-fr",
+        "de": "de",
+        "it": "it",
+        "ja": "ja",
+        "ko": "ko",
+        "zh": "cmn"
+    }
+    languages = frozenset(VOICES)
+
+    def __init__(self, words_per_minute: int = 175, timeout: float = 30.0):
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+        if not self.binary:
+            raise RuntimeError("espeak-ng is not installed (apt install espeak-ng)")
+        self.words_per_minute = words_per_minute
+        self.timeout = timeout
+
+    def synthesize(self, text: str, language: str) -> bytes:
+        # Text goes in on stdin so it is never parsed as command line options
+        result = subprocess.run(
+            [self.binary, "-v", self.VOICES.get(language, "en-us"),
+             "-s", str(self.words_per_minute), "--stdout"],
+            input=text.encode("utf-8"),
+            capture_output=True,
+            timeout=self.timeout,
+            check=True
+        )
+        return result.stdout
+
+
+TTS_BACKENDS = {
+    "gtts": GTTSBackend,
+    "espeak": EspeakBackend
+}
+
+
+def get_tts_backend(name: str) -> TTSBackend:
+    """Create the backend registered under `name` (case-insensitive)"""
+    try:
+        backend_class = TTS_BACKENDS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend '{name}', choose from: {', '.join(TTS_BACKENDS)}")
+    return backend_class()